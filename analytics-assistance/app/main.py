@@ -10,19 +10,109 @@ Startup Flow:
 4. Routes process user requirements with LLM
 """
 
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
+from functools import lru_cache
+from pathlib import Path
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from app.db import engine
-from app.schemas.schema_registry import load_schema, list_tables
+from app.schemas.schema_registry import (
+    SCHEMA_READY,
+    get_table_schema,
+    load_schema,
+    list_tables,
+    shutdown_reflect_executor
+)
 from app.routes import analytics
+from app.services.column_planner import (
+    close_http_client,
+    get_chain,
+    prefetch_plans,
+    warm_up_llm
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Deployment environment ("prod" disables the interactive API docs)
+ENV = os.getenv("ENV", "prod")
+DOCS_ENABLED = ENV != "prod"
+
+# Set BANNER=1 to print the verbose startup banner (off by default so
+# multi-worker startups don't flood stdout)
+BANNER = bool(os.getenv("BANNER"))
+
+# Optional JSON file of frequently asked requirements to plan in the
+# background after startup: [{"table": "...", "requirement": "..."}, ...]
+PLAN_PREFETCH_FILE = os.getenv("PLAN_PREFETCH_FILE")
+
+# Process-lifetime pool behind asyncio.to_thread() / run_in_executor(None, ...)
+# (column matching, prefetch file reads). Created once so worker threads are reused
+# across requests; installed as the loop's default executor in lifespan().
+DEFAULT_EXECUTOR = ThreadPoolExecutor(
+    max_workers=os.cpu_count() or 4,
+    thread_name_prefix="app-worker"
+)
 
 
 # ══════════════════════════════════════════════════════════════════
 # LIFESPAN MANAGEMENT - Startup and Shutdown Events
 # ══════════════════════════════════════════════════════════════════
 
+async def _warmup_llm_client() -> None:
+    """
+    Build the LLM chain and this loop's client, and open an API connection,
+    before the first request needs them.
+    
+    Runs on the app's event loop (not a thread): LLM clients and their
+    connection pools are per loop. A missing API key isn't fatal at
+    startup: the metadata endpoints still work and analyze requests will
+    report the error as before.
+    """
+    try:
+        get_chain()
+        await warm_up_llm()
+    except ValueError as e:
+        logger.warning("LLM warm-up skipped: %s", e)
+
+
+def _read_prefetch_file(path: str) -> list:
+    with open(path, "rb") as f:
+        return json.load(f)
+
+
+async def _prefetch_frequent_plans(path: str) -> None:
+    """
+    Warm the plan cache from PLAN_PREFETCH_FILE.
+    
+    Runs as a background task after startup, so the server takes requests
+    meanwhile. Entries for unknown tables are skipped.
+    """
+    try:
+        entries = await asyncio.to_thread(_read_prefetch_file, path)
+    except (OSError, ValueError) as e:
+        logger.warning("Plan prefetch skipped: cannot read %s: %s", path, e)
+        return
+    
+    items = []
+    for entry in entries:
+        table_schema = get_table_schema(entry.get("table", ""))
+        if table_schema is None:
+            logger.warning("Plan prefetch: unknown table %r", entry.get("table"))
+            continue
+        items.append((entry["table"], table_schema, entry.get("requirement", "")))
+    
+    cached = await prefetch_plans(items)
+    logger.info("Plan prefetch: %d of %d requirements cached", cached, len(items))
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -45,44 +135,66 @@ async def lifespan(app: FastAPI):
     # ═══════════════════════════════════════════════════════════
     # STARTUP
     # ═══════════════════════════════════════════════════════════
-    print("=" * 70)
-    print("🚀 Starting Analytics Assistant API...")
-    print("=" * 70)
     
-    # Load database schemas into memory
-    print("\n📦 Loading database schemas...")
-    await load_schema(engine)
+    asyncio.get_running_loop().set_default_executor(DEFAULT_EXECUTOR)
+    
+    # Load database schemas into memory while the LLM client is built
+    await asyncio.gather(load_schema(engine), _warmup_llm_client())
+    
+    # Pre-serialize the read-only metadata endpoints (schemas never change
+    # while the process is running)
+    app.state.list_tables_response = analytics.build_list_tables_response()
+    app.state.table_schema_responses = analytics.build_table_schema_responses()
+    app.state.list_tables_etag = analytics.build_etag(app.state.list_tables_response)
+    app.state.table_schema_etags = {
+        table_name: analytics.build_etag(body)
+        for table_name, body in app.state.table_schema_responses.items()
+    }
+    
+    if DOCS_ENABLED:
+        # Build the OpenAPI schema now so the first /docs hit doesn't pay for it
+        app.openapi()
     
     tables = list_tables()
-    print(f"✅ Loaded {len(tables)} tables into cache:")
-    for table in tables:
-        print(f"   - {table}")
-    
-    print("\n" + "=" * 70)
-    print("✅ Server ready to accept requests!")
-    print("=" * 70)
-    print("\n📚 API Documentation:")
-    print("   - Swagger UI: http://localhost:8000/docs")
-    print("   - ReDoc: http://localhost:8000/redoc")
-    print("\n💰 Cost per analysis: ~$0.0002 (0.02 cents)")
-    print("=" * 70 + "\n")
+    logger.info("startup: %d tables loaded", len(tables))
+    
+    # Plan frequent requirements in the background (needs the schemas)
+    prefetch_task = (
+        asyncio.create_task(_prefetch_frequent_plans(PLAN_PREFETCH_FILE))
+        if PLAN_PREFETCH_FILE else None
+    )
+    
+    if BANNER:
+        print("=" * 70)
+        print("🚀 Analytics Assistant API ready")
+        print("=" * 70)
+        print(f"✅ Loaded {len(tables)} tables into cache:")
+        for table in tables:
+            print(f"   - {table}")
+        if DOCS_ENABLED:
+            print("\n📚 API Documentation:")
+            print("   - Swagger UI: http://localhost:8000/docs")
+            print("   - ReDoc: http://localhost:8000/redoc")
+        print("\n💰 Cost per analysis: ~$0.0002 (0.02 cents)")
+        print("=" * 70 + "\n")
     
     yield  # Server runs and handles requests here
     
     # ═══════════════════════════════════════════════════════════
     # SHUTDOWN
     # ═══════════════════════════════════════════════════════════
-    print("\n" + "=" * 70)
-    print("🛑 Shutting down Analytics Assistant API...")
-    print("=" * 70)
     
-    # Close database connection
-    await engine.dispose()
-    print("✅ Database connection closed")
+    # Stop any prefetch still running before its LLM pool is closed
+    if prefetch_task is not None and not prefetch_task.done():
+        prefetch_task.cancel()
+        await asyncio.gather(prefetch_task, return_exceptions=True)
     
-    print("=" * 70)
-    print("👋 Goodbye!")
-    print("=" * 70 + "\n")
+    # Close database connection and stop the worker threads
+    await engine.dispose()
+    await close_http_client()
+    shutdown_reflect_executor()
+    DEFAULT_EXECUTOR.shutdown(wait=False)
+    logger.info("shutdown: database and LLM connections closed")
 
 
 # ══════════════════════════════════════════════════════════════════
@@ -91,63 +203,50 @@ async def lifespan(app: FastAPI):
 
 app = FastAPI(
     title="Analytics Assistant API",
-    description="""
-    🤖 AI-Powered Analytics Column Analyzer
-    
-    This API helps you understand what database columns are needed for analytics requirements.
-    
-    ## Features
-    
-    * 🧠 **LLM-Powered Analysis**: Uses GPT-4o-mini to understand natural language
-    * ⚡ **Fast**: Schemas cached in memory, responses in 1-2 seconds
-    * 💰 **Cheap**: ~$0.0002 per analysis (0.02 cents)
-    * ✅ **Smart Matching**: Fuzzy matching handles imprecise requirements
-    * 📊 **Complete Output**: Technical summary, required/missing columns, recommendations
-    
-    ## Usage
-    
-    1. **List Tables**: `GET /tables`
-    2. **Get Schema**: `GET /tables/{table_name}/schema`
-    3. **Analyze Requirement**: `POST /analyze/columns`
-    
-    ## Example
-    
-    ```json
-    POST /analyze/columns
-    {
-      "table_name": "crm_customers",
-      "requirement": "Show me average MRR by industry"
-    }
-    ```
-    
-    Returns:
-    ```json
-    {
-      "technical_summary": "Calculate average MRR grouped by industry",
-      "required_columns": ["mrr", "industry"],
-      "available_columns": ["mrr", "industry"],
-      "missing_columns": [],
-      "recommendations": ["✅ All columns available"]
-    }
-    ```
-    """,
     version="1.0.0",
+    default_response_class=ORJSONResponse,  # orjson is much faster than stdlib json
     lifespan=lifespan,  # ← Startup/shutdown events
-    docs_url="/docs",
-    redoc_url="/redoc"
+    # Docs and openapi.json are only served outside production
+    docs_url="/docs" if DOCS_ENABLED else None,
+    redoc_url="/redoc" if DOCS_ENABLED else None,
+    openapi_url="/openapi.json" if DOCS_ENABLED else None
 )
 
 
+@lru_cache(maxsize=1)
+def _load_description() -> str:
+    """Read the API description markdown (at most once per process)."""
+    return (Path(__file__).parent / "description.md").read_text(encoding="utf-8")
+
+
+def custom_openapi():
+    """
+    Generate the OpenAPI schema, pulling in the long description lazily.
+    
+    FastAPI caches the result on app.openapi_schema, so this only does real
+    work on the first call (made during startup when docs are enabled).
+    """
+    if app.openapi_schema:
+        return app.openapi_schema
+    app.description = _load_description()
+    return FastAPI.openapi(app)
+
+
+app.openapi = custom_openapi
+
+
 # ══════════════════════════════════════════════════════════════════
 # MIDDLEWARE - CORS for frontend integration
 # ══════════════════════════════════════════════════════════════════
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # In production, specify exact origins
+    # Comma-separated list of allowed origins (default: React dev server)
+    allow_origins=os.getenv("CORS_ORIGINS", "http://localhost:3000").split(","),
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["content-type", "authorization"],
+    max_age=86400,  # Let browsers cache preflight responses for 24h
 )
 
 
@@ -177,11 +276,13 @@ async def root():
         "service": "Analytics Assistant API",
         "status": "running",
         "version": "1.0.0",
-        "docs": "/docs",
+        "docs": app.docs_url,
         "endpoints": {
             "list_tables": "GET /api/tables",
             "get_schema": "GET /api/tables/{table_name}/schema",
-            "analyze": "POST /api/analyze/columns"
+            "ready": "GET /health/ready",
+            "analyze": "POST /api/analyze/columns",
+            "analyze_batch": "POST /api/analyze/columns/batch"
         }
     }
 
@@ -203,6 +304,26 @@ async def health_check():
     }
 
 
+@app.get("/health/ready", tags=["Health"])
+async def readiness_check():
+    """
+    Readiness probe.
+    
+    Returns 503 until the schema cache has been loaded, 200 afterwards.
+    """
+    if not SCHEMA_READY.is_set():
+        return ORJSONResponse(
+            status_code=503,
+            content={"status": "starting", "schemas_loaded": False}
+        )
+    
+    return {
+        "status": "ready",
+        "schemas_loaded": True,
+        "tables_count": len(list_tables())
+    }
+
+
 # ══════════════════════════════════════════════════════════════════
 # RUN SERVER (for development)
 # ══════════════════════════════════════════════════════════════════
@@ -210,11 +331,24 @@ async def health_check():
 if __name__ == "__main__":
     import uvicorn
     
-    uvicorn.run(
-        "app.main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,  # Auto-reload on code changes (dev only)
-        log_level="info"
-    )
-
+    if ENV == "dev":
+        # Auto-reload on code changes (reload can't be combined with workers)
+        uvicorn.run(
+            "app.main:app",
+            host="0.0.0.0",
+            port=8000,
+            reload=True,
+            log_level="info"
+        )
+    else:
+        uvicorn.run(
+            "app.main:app",
+            host="0.0.0.0",
+            port=8000,
+            reload=False,
+            workers=int(os.getenv("UVICORN_WORKERS", "4")),
+            loop="uvloop",  # libuv event loop (from uvicorn[standard])
+            http="httptools",  # C HTTP parser instead of h11
+            log_level="warning",
+            access_log=False  # Per-request access logs are costly under load
+        )
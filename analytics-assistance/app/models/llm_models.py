@@ -10,15 +10,17 @@ Why Pydantic?
 - Self-documenting: Field descriptions help both developers and LLM
 
 How LangChain uses this:
-1. We pass this model to LangChain: llm.with_structured_output(ColumnPlanOutput)
-2. LangChain tells the LLM: "Your response must match this JSON structure"
-3. LLM returns JSON
-4. LangChain validates and converts to Python object
+1. The prompt tells the LLM: "Return your analysis in this exact JSON format"
+2. The LLM is called in JSON mode and returns a JSON object
+3. ColumnPlanOutput.model_validate_json() parses and validates it in one pass
+4. We get a Python object (invalid output raises a ValidationError)
 5. We get type-safe access: result.required_columns (not result["required_columns"])
 """
 
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Dict, Any, Optional, Union
+import json
+
+from pydantic import BaseModel, Field, ConfigDict, field_validator
+from typing import Annotated, Any
 
 
 class ColumnPlanOutput(BaseModel):
@@ -37,55 +39,65 @@ class ColumnPlanOutput(BaseModel):
     }
     """
     
-    technical_summary: str = Field(
+    # Built once per LLM call and only read afterwards
+    model_config = ConfigDict(frozen=True, extra='ignore', validate_assignment=False)
+    
+    technical_summary: Annotated[str, Field(
         description=(
             "A clear technical interpretation of the user's requirement. "
             "Explain WHAT analysis is needed in database terms."
         ),
-        examples=[
-            "Calculate average MRR, grouped by industry, filtered for customers created in last 6 months",
-            "Count total orders per vendor, sorted by revenue",
-        ]
-    )
+        json_schema_extra={
+            "examples": [
+                "Calculate average MRR, grouped by industry, filtered for customers created in last 6 months",
+                "Count total orders per vendor, sorted by revenue",
+            ]
+        }
+    )]
     
-    required_columns: List[str] = Field(
+    required_columns: Annotated[list[str], Field(
         description=(
             "List of column names that are ABSOLUTELY NECESSARY for this analysis. "
             "Without these columns, the analysis cannot be performed. "
             "Only include actual column names (lowercase, no spaces)."
         ),
-        examples=[
-            ["mrr", "industry", "created_at"],
-            ["order_id", "vendor_id", "total_amount"]
-        ]
-    )
+        json_schema_extra={
+            "examples": [
+                ["mrr", "industry", "created_at"],
+                ["order_id", "vendor_id", "total_amount"]
+            ]
+        }
+    )]
     
-    optional_columns: List[str] = Field(
+    optional_columns: Annotated[list[str], Field(
         default_factory=list,  # If LLM doesn't provide this, use empty list []
         description=(
             "List of columns that would ENHANCE the analysis but aren't critical. "
             "These columns add context, enable better filtering, or provide additional insights."
         ),
-        examples=[
-            ["country", "segment", "plan_type"],
-            ["customer_name", "city"]
-        ]
-    )
+        json_schema_extra={
+            "examples": [
+                ["country", "segment", "plan_type"],
+                ["customer_name", "city"]
+            ]
+        }
+    )]
     
-    assumptions: str = Field(
+    assumptions: Annotated[str, Field(
         description=(
             "Any assumptions made while interpreting the requirement. "
             "Mention if you assumed a specific column for date filtering, "
             "aggregation method, or interpretation of ambiguous terms."
         ),
-        examples=[
-            "Assumed 'created_at' is the date column for 'last 6 months' filtering",
-            "Interpreted 'revenue' as 'total_amount' column",
-        ]
-    )
+        json_schema_extra={
+            "examples": [
+                "Assumed 'created_at' is the date column for 'last 6 months' filtering",
+                "Interpreted 'revenue' as 'total_amount' column",
+            ]
+        }
+    )]
     
-    sql_filters: Optional[str] = Field(
-        default=None,
+    sql_filters: Annotated[str | None, Field(
         description=(
             "SQL filter conditions extracted from the user's query as a JSON string. "
             "Format: {\"column_name\": \"value\"} for equality, or {\"column_name\": {\"operator\": value}} for comparisons. "
@@ -97,12 +109,23 @@ class ColumnPlanOutput(BaseModel):
             "Leave as null if no specific filters are mentioned. "
             "MUST be valid JSON string or null."
         ),
-        examples=[
-            "{\"industry\": \"Healthcare\", \"arr\": {\">\": 100000}}",
-            "{\"segment\": \"Enterprise\", \"mrr\": {\">\": 5000}}",
-            "{\"country\": \"USA\", \"is_active\": 1}"
-        ]
-    )
+        json_schema_extra={
+            "examples": [
+                "{\"industry\": \"Healthcare\", \"arr\": {\">\": 100000}}",
+                "{\"segment\": \"Enterprise\", \"mrr\": {\">\": 5000}}",
+                "{\"country\": \"USA\", \"is_active\": 1}"
+            ]
+        }
+    )] = None
+    
+    @field_validator("sql_filters", mode="before")
+    @classmethod
+    def _filters_to_json_string(cls, value: Any) -> Any:
+        # In JSON mode the LLM follows the prompt and returns sql_filters as
+        # an object; keep the field a JSON string as downstream code expects
+        if isinstance(value, dict):
+            return json.dumps(value)
+        return value
     
     # Optional: Add a custom method for easier debugging
     def __str__(self) -> str:
@@ -117,10 +140,23 @@ ColumnPlanOutput:
 """
 
 
+class ColumnPlanBatchOutput(BaseModel):
+    """
+    Structured output for the batch prompt: one ColumnPlanOutput per
+    requirement, in the order the requirements were given.
+    
+    Wrapped in an object because JSON mode requires a top-level object.
+    """
+    
+    model_config = ConfigDict(frozen=True, extra='ignore')
+    
+    results: list[ColumnPlanOutput]
+
+
 # Future: You can add more models here as needed
 # Example:
 # class SQLGenerationOutput(BaseModel):
 #     sql_query: str
 #     explanation: str
-#     warnings: List[str]
+#     warnings: list[str]
 
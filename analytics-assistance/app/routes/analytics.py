@@ -8,8 +8,15 @@ It wires together all the modules we built:
 - column_matcher (compare required vs available)
 """
 
-from fastapi import APIRouter, HTTPException, status
-from typing import List
+import asyncio
+import hashlib
+import os
+from decimal import Decimal
+
+import orjson
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from fastapi.responses import ORJSONResponse
+from typing import Any, Dict, List, Tuple
 
 from app.routes.schema import (
     AnalyzeColumnsRequest,
@@ -21,8 +28,20 @@ from app.routes.schema import (
     GenerateReportRequest,
     GenerateReportResponse
 )
-from app.schemas.schema_registry import list_tables, get_table_schema
-from app.services.column_planner import plan_columns
+from app.schemas import schema_registry
+from app.schemas.schema_registry import (
+    SCHEMA_READY,
+    get_schema_or_404
+)
+from app.services.column_planner import (
+    DEFAULT_MODEL,
+    LLM_MAX_CONCURRENCY,
+    PLAN_CACHE_TTL,
+    PLAN_RESULT_CACHE_SIZE,
+    plan_columns,
+    normalize_requirement
+)
+from app.services.llm_cache import LLMCache
 from app.services.column_matcher import match_columns
 from app.services.report_generator import generate_report
 from app.db import engine
@@ -35,16 +54,307 @@ from app.db import engine
 router = APIRouter()
 
 
+# ══════════════════════════════════════════════════════════════════
+# CACHED LOOKUPS - Schema set is fixed once load_schema() has run
+# ══════════════════════════════════════════════════════════════════
+
+def _require_schema_ready() -> None:
+    """Fail fast with 503 if the schema cache hasn't been loaded yet."""
+    if not SCHEMA_READY.is_set():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={
+                "error": "Schemas not loaded yet",
+                "detail": "The server is still starting up, retry shortly"
+            }
+        )
+
+
+def _table_not_found(table_name: str) -> HTTPException:
+    """Build the 404 raised when a request names an unknown table."""
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail={
+            "error": f"Table '{table_name}' not found",
+            "detail": f"Available tables: {schema_registry.AVAILABLE_TABLES_CSV}"
+        }
+    )
+
+
+def build_list_tables_response() -> str:
+    """
+    Serialize the GET /tables payload once.
+    
+    Called from the app lifespan after load_schema(); the result is kept on
+    app.state and served as-is on every request.
+    """
+    # Single pass over the cache instead of a get_table_schema() per name
+    schema_cache = schema_registry.SCHEMA_CACHE
+    return ListTablesResponse(
+        tables=[
+            TableInfo(
+                table_name=table_name,
+                column_count=len(schema['columns'])
+            )
+            for table_name, schema in schema_cache.items()
+        ],
+        total_tables=len(schema_cache)
+    ).model_dump_json()
+
+
+def build_table_schema_responses() -> Dict[str, str]:
+    """
+    Serialize every GET /tables/{table_name}/schema payload once.
+    
+    Returns a dict of table name -> JSON string, kept on app.state.
+    """
+    responses = {}
+    for table_name, schema in schema_registry.SCHEMA_CACHE.items():
+        responses[table_name] = TableSchemaResponse(
+            table_name=table_name,
+            columns=schema['columns'],
+            total_columns=len(schema['columns'])
+        ).model_dump_json()
+    return responses
+
+
+def build_etag(body: str) -> str:
+    """
+    Compute a strong ETag for one pre-serialized metadata payload.
+    
+    Tags are content hashes, so a table's schema tag only changes when that
+    table's schema does (and is stable across workers and restarts).
+    """
+    return f'"{hashlib.blake2b(body.encode(), digest_size=8).hexdigest()}"'
+
+
+# Metadata responses may be cached by browsers/proxies for 5 minutes
+METADATA_CACHE_CONTROL = "public, max-age=300"
+
+
+def _metadata_response(request: Request, body: str, etag: str) -> Response:
+    """
+    Serve a pre-serialized metadata payload with caching headers.
+    
+    Returns 304 Not Modified (no body) when the client already holds the
+    current version (If-None-Match matches the payload's ETag).
+    """
+    headers = {"ETag": etag, "Cache-Control": METADATA_CACHE_CONTROL}
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (
+        if_none_match.strip() == "*"
+        or etag in (tag.strip() for tag in if_none_match.split(","))
+    ):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _orjson_default(obj):
+    # NUMERIC/DECIMAL columns come back as Decimal, which orjson doesn't
+    # handle natively; match FastAPI's jsonable_encoder (Decimal -> float)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError
+
+
+class ReportJSONResponse(ORJSONResponse):
+    """ORJSONResponse that also serializes Decimal values from DB rows."""
+    
+    def render(self, content) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_orjson_default,
+            option=orjson.OPT_NON_STR_KEYS
+        )
+
+
+# ══════════════════════════════════════════════════════════════════
+# ANALYSIS CACHE - Repeat (table, requirement) requests skip the pipeline
+# ══════════════════════════════════════════════════════════════════
+
+# (schema version, model, table name, normalized requirement) -> finished
+# analysis dict. Planning and matching are both deterministic for a given
+# schema and model, so a repeat request is one dict lookup (no LLM call, no
+# match_columns). Same size and TTL as column_planner's plan cache, so a
+# cached analysis never outlives the plan it was built from.
+_analysis_cache = LLMCache(maxsize=PLAN_RESULT_CACHE_SIZE, ttl=PLAN_CACHE_TTL)
+
+# Same key -> running _run_analysis() task. Concurrent identical requests
+# await the same task (one LLM call); it is dropped as soon as it finishes.
+_analysis_inflight: Dict[Tuple[int, str, str, str], asyncio.Task] = {}
+
+
+def _finish_analysis(key: Tuple[int, str, str, str], task: asyncio.Task) -> None:
+    if _analysis_inflight.get(key) is task:
+        del _analysis_inflight[key]
+    # Failed or cancelled runs aren't cached, so the next request retries
+    if not task.cancelled() and task.exception() is None:
+        _analysis_cache.set(key, task.result())
+
+
+async def _analyze_cached(
+    table_name: str,
+    table_schema: dict,
+    requirement: str
+) -> Dict[str, Any]:
+    """
+    _run_analysis() behind a TTL cache, shared between overlapping requests.
+    
+    Keyed on the schema version and model too, so a schema reload or model
+    change never serves a result built against old columns or another
+    model. The returned dict is shared between requests and must not be
+    mutated.
+    """
+    key = (
+        schema_registry.SCHEMA_VERSION,
+        DEFAULT_MODEL,
+        table_name,
+        normalize_requirement(requirement)
+    )
+    
+    cached = _analysis_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    task = _analysis_inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(
+            _run_analysis(table_name, table_schema, requirement)
+        )
+        task.add_done_callback(lambda t: _finish_analysis(key, t))
+        _analysis_inflight[key] = task
+    
+    # shield(): a client disconnecting mustn't cancel a run others await
+    return await asyncio.shield(task)
+
+
+# ══════════════════════════════════════════════════════════════════
+# ANALYSIS PIPELINE - Shared by single and batch endpoints
+# ══════════════════════════════════════════════════════════════════
+
+async def _run_analysis(
+    table_name: str,
+    table_schema: dict,
+    requirement: str
+) -> Dict[str, Any]:
+    """
+    LLM planning + column matching for an already-validated table.
+    
+    Raises HTTPException (500) if either step fails.
+    """
+    
+    # ═══════════════════════════════════════════════════════════
+    # STEP 3: LLM Analysis - Determine required columns
+    # ═══════════════════════════════════════════════════════════
+    
+    try:
+        llm_result = await plan_columns(
+            table_name=table_name,
+            table_schema=table_schema,
+            user_requirement=requirement,
+            verbose=False  # Set to True to see token usage in logs
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={
+                "error": "LLM analysis failed",
+                "detail": str(e)
+            }
+        )
+    
+    # ═══════════════════════════════════════════════════════════
+    # STEP 4: Column Matching - Compare required vs available
+    # ═══════════════════════════════════════════════════════════
+    
+    # Fuzzy matching is CPU work that grows with table width; run it in a
+    # worker thread so it can't stall other requests on the event loop.
+    # (Schema lookups are plain dict lookups and stay inline.)
+    try:
+        match_result = await asyncio.to_thread(match_columns, table_schema, llm_result)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={
+                "error": "Column matching failed",
+                "detail": str(e)
+            }
+        )
+    
+    # to_dict() already has the AnalyzeColumnsResponse shape and only
+    # str/list/dict/bool values, so it is serialized as-is instead of being
+    # validated into a model and then re-validated against response_model
+    return match_result.to_dict()
+
+
+async def _analyze_one(request: AnalyzeColumnsRequest) -> Dict[str, Any]:
+    """
+    Run the full analysis pipeline for a single requirement.
+    
+    Returns the AnalyzeColumnsResponse payload as a plain dict of JSON-native
+    values, ready to hand to orjson.
+    
+    Raises HTTPException (404/500/503) on failure, same as the endpoints.
+    """
+    
+    # ═══════════════════════════════════════════════════════════
+    # STEP 1-2: Validate table exists and get its schema (one lookup)
+    # ═══════════════════════════════════════════════════════════
+    
+    _require_schema_ready()
+    
+    try:
+        table_schema = get_schema_or_404(request.table_name)
+    except KeyError:
+        raise _table_not_found(request.table_name)
+    
+    # ═══════════════════════════════════════════════════════════
+    # STEP 3-5: Plan, match and return (cached per requirement)
+    # ═══════════════════════════════════════════════════════════
+    
+    return await _analyze_cached(
+        request.table_name,
+        table_schema,
+        request.requirement
+    )
+
+
+async def _analyze_many(
+    requests: List[AnalyzeColumnsRequest]
+) -> List[Dict[str, Any]]:
+    """
+    Run several analyses concurrently, at most LLM_MAX_CONCURRENCY at a time.
+    
+    Each analysis spends almost all of its time awaiting the LLM, so
+    gathering them lets the LLM calls overlap on one event loop instead
+    of running back to back. The first failure is raised.
+    """
+    semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    
+    async def _analyze_bounded(request: AnalyzeColumnsRequest) -> Dict[str, Any]:
+        async with semaphore:
+            return await _analyze_one(request)
+    
+    return list(await asyncio.gather(*(_analyze_bounded(r) for r in requests)))
+
+
+# Max requirements accepted by POST /analyze/columns/batch
+ANALYZE_BATCH_MAX_ITEMS = int(os.getenv("ANALYZE_BATCH_MAX_ITEMS", "50"))
+
+
 # ══════════════════════════════════════════════════════════════════
 # MAIN ENDPOINT - Analyze Columns for Requirement
 # ══════════════════════════════════════════════════════════════════
 
 @router.post(
     "/analyze/columns",
-    response_model=AnalyzeColumnsResponse,
+    response_model=AnalyzeColumnsResponse,  # Documents the shape (not re-validated)
     responses={
         404: {"model": ErrorResponse, "description": "Table not found"},
-        500: {"model": ErrorResponse, "description": "Internal server error"}
+        500: {"model": ErrorResponse, "description": "Internal server error"},
+        503: {"model": ErrorResponse, "description": "Schemas not loaded yet"}
     },
     summary="Analyze Column Requirements",
     description="""
@@ -85,76 +395,50 @@ async def analyze_columns(request: AnalyzeColumnsRequest):
         }
     """
     
-    # ═══════════════════════════════════════════════════════════
-    # STEP 1: Validate table exists
-    # ═══════════════════════════════════════════════════════════
-    
-    available_tables = list_tables()
-    
-    if request.table_name not in available_tables:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail={
-                "error": f"Table '{request.table_name}' not found",
-                "detail": f"Available tables: {', '.join(available_tables)}"
-            }
-        )
-    
-    # ═══════════════════════════════════════════════════════════
-    # STEP 2: Get table schema from cache (fast!)
-    # ═══════════════════════════════════════════════════════════
-    
-    table_schema = get_table_schema(request.table_name)
-    
-    if not table_schema:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail={
-                "error": "Failed to retrieve table schema",
-                "detail": "Schema cache may be corrupted"
-            }
-        )
-    
-    # ═══════════════════════════════════════════════════════════
-    # STEP 3: LLM Analysis - Determine required columns
-    # ═══════════════════════════════════════════════════════════
+    results = await _analyze_many([request])
+    return ORJSONResponse(content=results[0])
+
+
+@router.post(
+    "/analyze/columns/batch",
+    response_model=List[AnalyzeColumnsResponse],  # Documents the shape (not re-validated)
+    responses={
+        400: {"model": ErrorResponse, "description": "Too many requirements in one batch"},
+        404: {"model": ErrorResponse, "description": "Table not found"},
+        500: {"model": ErrorResponse, "description": "Internal server error"},
+        503: {"model": ErrorResponse, "description": "Schemas not loaded yet"}
+    },
+    summary="Analyze Several Column Requirements",
+    description="""
+    Analyze a list of requirements in one call (at most ANALYZE_BATCH_MAX_ITEMS).
     
-    try:
-        llm_result = await plan_columns(
-            table_name=request.table_name,
-            table_schema=table_schema,
-            user_requirement=request.requirement,
-            verbose=False  # Set to True to see token usage in logs
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail={
-                "error": "LLM analysis failed",
-                "detail": str(e)
-            }
-        )
+    The LLM calls run concurrently, so the batch takes about as long as the
+    slowest single analysis. Results are returned in request order.
+    """
+)
+async def analyze_columns_batch(requests: List[AnalyzeColumnsRequest]):
+    """
+    Batch version of POST /api/analyze/columns.
     
-    # ═══════════════════════════════════════════════════════════
-    # STEP 4: Column Matching - Compare required vs available
-    # ═══════════════════════════════════════════════════════════
+    Example Request:
+        POST /api/analyze/columns/batch
+        [
+          {"table_name": "crm_customers", "requirement": "Average MRR by industry"},
+          {"table_name": "crm_customers", "requirement": "Customer count by country"}
+        ]
+    """
     
-    try:
-        match_result = match_columns(table_schema, llm_result)
-    except Exception as e:
+    # Every item can cost an LLM call; don't let one POST fan out unbounded
+    if len(requests) > ANALYZE_BATCH_MAX_ITEMS:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            status_code=status.HTTP_400_BAD_REQUEST,
             detail={
-                "error": "Column matching failed",
-                "detail": str(e)
+                "error": "Too many requirements",
+                "detail": f"At most {ANALYZE_BATCH_MAX_ITEMS} requirements per batch, got {len(requests)}"
             }
         )
     
-    # ═══════════════════════════════════════════════════════════
-    # STEP 5: Return complete response
-    # ═══════════════════════════════════════════════════════════
-    
-    return AnalyzeColumnsResponse(**match_result.to_dict())
+    return ORJSONResponse(content=await _analyze_many(requests))
 
 
 # ══════════════════════════════════════════════════════════════════
@@ -167,7 +451,7 @@ async def analyze_columns(request: AnalyzeColumnsRequest):
     summary="List All Tables",
     description="Get a list of all available tables in the database"
 )
-async def get_tables():
+async def get_tables(request: Request):
     """
     List all available tables.
     
@@ -175,21 +459,11 @@ async def get_tables():
     Users can use this to select which table to analyze.
     """
     
-    tables = list_tables()
-    
-    table_info_list = []
-    for table_name in tables:
-        schema = get_table_schema(table_name)
-        table_info_list.append(
-            TableInfo(
-                table_name=table_name,
-                column_count=len(schema['columns'])
-            )
-        )
-    
-    return ListTablesResponse(
-        tables=table_info_list,
-        total_tables=len(tables)
+    # Pre-serialized at startup (see build_list_tables_response)
+    return _metadata_response(
+        request,
+        request.app.state.list_tables_response,
+        request.app.state.list_tables_etag
     )
 
 
@@ -202,7 +476,7 @@ async def get_tables():
     summary="Get Table Schema",
     description="Get detailed schema information for a specific table"
 )
-async def get_table_schema_endpoint(table_name: str):
+async def get_table_schema_endpoint(table_name: str, request: Request):
     """
     Get detailed schema for a specific table.
     
@@ -210,23 +484,16 @@ async def get_table_schema_endpoint(table_name: str):
     Useful for exploring what data is available.
     """
     
-    available_tables = list_tables()
+    # Pre-serialized at startup (see build_table_schema_responses)
+    schema_json = request.app.state.table_schema_responses.get(table_name)
     
-    if table_name not in available_tables:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail={
-                "error": f"Table '{table_name}' not found",
-                "detail": f"Available tables: {', '.join(available_tables)}"
-            }
-        )
-    
-    schema = get_table_schema(table_name)
+    if schema_json is None:
+        raise _table_not_found(table_name)
     
-    return TableSchemaResponse(
-        table_name=table_name,
-        columns=schema['columns'],
-        total_columns=len(schema['columns'])
+    return _metadata_response(
+        request,
+        schema_json,
+        request.app.state.table_schema_etags[table_name]
     )
 
 
@@ -236,10 +503,13 @@ async def get_table_schema_endpoint(table_name: str):
 
 @router.post(
     "/reports/generate",
-    response_model=GenerateReportResponse,
+    response_model=GenerateReportResponse,  # Documents the shape (not re-validated)
+    response_class=ReportJSONResponse,
     responses={
+        400: {"model": ErrorResponse, "description": "Invalid columns or filters"},
         404: {"model": ErrorResponse, "description": "Table not found"},
-        500: {"model": ErrorResponse, "description": "Query execution failed"}
+        500: {"model": ErrorResponse, "description": "Query execution failed"},
+        503: {"model": ErrorResponse, "description": "Schemas not loaded yet"}
     },
     summary="Generate Report with Real Data",
     description="""
@@ -267,7 +537,8 @@ async def generate_report_endpoint(request: GenerateReportRequest):
           "table_name": "crm_customers",
           "columns": ["customer_id", "first_name", "segment", "mrr"],
           "filters": {"segment": "Enterprise"},
-          "limit": 50
+          "limit": 50,
+          "include_query": true
         }
     
     Example Response:
@@ -284,35 +555,30 @@ async def generate_report_endpoint(request: GenerateReportRequest):
     """
     
     # ═══════════════════════════════════════════════════════════
-    # STEP 1: Validate table exists
+    # STEP 1: Validate table exists (and fetch its schema)
     # ═══════════════════════════════════════════════════════════
     
-    available_tables = list_tables()
+    _require_schema_ready()
     
-    if request.table_name not in available_tables:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail={
-                "error": f"Table '{request.table_name}' not found",
-                "detail": f"Available tables: {', '.join(available_tables)}"
-            }
-        )
+    try:
+        table_schema = get_schema_or_404(request.table_name)
+    except KeyError:
+        raise _table_not_found(request.table_name)
     
     # ═══════════════════════════════════════════════════════════
     # STEP 2: Validate columns exist in table
     # ═══════════════════════════════════════════════════════════
     
-    table_schema = get_table_schema(request.table_name)
-    available_columns = [col['name'] for col in table_schema['columns']]
+    column_name_set = table_schema['column_name_set']
     
-    invalid_columns = [col for col in request.columns if col not in available_columns]
+    invalid_columns = [col for col in request.columns if col not in column_name_set]
     
     if invalid_columns:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={
                 "error": f"Invalid columns: {', '.join(invalid_columns)}",
-                "detail": f"Available columns: {', '.join(available_columns)}"
+                "detail": f"Available columns: {', '.join(table_schema['column_names'])}"
             }
         )
     
@@ -326,7 +592,18 @@ async def generate_report_endpoint(request: GenerateReportRequest):
             table_name=request.table_name,
             columns=request.columns,
             filters=request.filters,
-            limit=request.limit or 100
+            limit=request.limit or 100,
+            include_executed_query=request.include_query,
+            output_format=request.output_format
+        )
+    except ValueError as e:
+        # Bad filter spec (e.g. unsupported operator), not a DB failure
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "error": "Invalid filters",
+                "detail": str(e)
+            }
         )
     except Exception as e:
         raise HTTPException(
@@ -341,7 +618,9 @@ async def generate_report_endpoint(request: GenerateReportRequest):
     # STEP 4: Return real data
     # ═══════════════════════════════════════════════════════════
     
-    return GenerateReportResponse(**result)
+    # ReportResult (a dataclass) goes straight to orjson: no Pydantic
+    # re-validation or jsonable_encoder walk over potentially thousands of rows
+    return ReportJSONResponse(content=result)
 
 
 # ══════════════════════════════════════════════════════════════════
@@ -11,7 +11,7 @@ Why separate from LLM models?
 """
 
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any, Union
 
 
 # ══════════════════════════════════════════════════════════════════
@@ -252,6 +252,19 @@ class GenerateReportRequest(BaseModel):
         description="Maximum number of rows to return (default: 100, max: 1000)"
     )
     
+    include_query: bool = Field(
+        default=False,
+        description="Return the executed SQL (values inlined) in query_executed, for debugging"
+    )
+    
+    output_format: Literal["records", "columns"] = Field(
+        default="records",
+        description=(
+            "Shape of data: 'records' = one object per row, "
+            "'columns' = {column: [values]} (smaller and faster for large results)"
+        )
+    )
+    
     class Config:
         json_schema_extra = {
             "example": {
@@ -294,12 +307,13 @@ class GenerateReportResponse(BaseModel):
         description="Number of rows returned"
     )
     
-    data: List[Dict[str, Any]] = Field(
-        description="Actual data rows from the database"
+    data: Union[List[Dict[str, Any]], Dict[str, List[Any]]] = Field(
+        description="Actual data rows from the database (per column for output_format='columns')"
     )
     
-    query_executed: str = Field(
-        description="SQL query that was executed (for debugging)"
+    query_executed: Optional[str] = Field(
+        default=None,
+        description="SQL query that was executed (for debugging; null unless include_query is set)"
     )
     
     class Config:
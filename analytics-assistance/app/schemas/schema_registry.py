@@ -1,11 +1,72 @@
-from sqlalchemy import MetaData
-from sqlalchemy.ext.asyncio import AsyncEngine, async_engine_from_config
-from typing import Dict, Any
+import asyncio
+import hashlib
+import logging
+import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import MetaData, create_engine
+from sqlalchemy.engine import Engine, URL
+from sqlalchemy.pool import NullPool
+from sqlalchemy.ext.asyncio import AsyncEngine
+from typing import Dict, Any, FrozenSet, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Public API. Module state that load_schema() rebinds (SCHEMA_VERSION,
+# TABLE_NAMES_*, AVAILABLE_TABLES_CSV) should be read as
+# schema_registry.<NAME>, not imported by name, or the importer keeps the
+# value from import time.
+__all__ = [
+    "SCHEMA_CACHE",
+    "SCHEMA_READY",
+    "load_schema",
+    "table_to_dict",
+    "build_similarity_index",
+    "compute_schema_hash",
+    "get_table_schema",
+    "get_schema_or_404",
+    "list_tables",
+    "table_exists",
+    "shutdown_reflect_executor",
+]
 
 
 # Store table schemas in memory
 SCHEMA_CACHE: Dict[str, dict] = {}
 
+# Bumped every time load_schema() finishes; lets callers key their own
+# caches on the loaded schema set without worrying about stale entries
+SCHEMA_VERSION: int = 0
+
+# Table names, materialized once per load_schema() (the cache is read-only
+# afterwards): a tuple for listing and a frozenset for O(1) membership checks
+TABLE_NAMES_TUPLE: Tuple[str, ...] = ()
+TABLE_NAMES_SET: FrozenSet[str] = frozenset()
+
+# Sorted, comma-separated table names for "Available tables: ..." errors
+AVAILABLE_TABLES_CSV: str = ""
+
+# Set once load_schema() has populated SCHEMA_CACHE; readiness probes and
+# request handlers check it to fail fast with 503 instead of a misleading 404/500
+SCHEMA_READY = asyncio.Event()
+
+# Reflection is blocking, catalog-heavy work; it runs on these threads so the
+# event loop keeps answering (e.g. health probes) while schemas load.
+# Shut down from the app lifespan via shutdown_reflect_executor().
+REFLECT_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="schema-reflect")
+
+# Layout of the dicts table_to_dict() builds. Part of the schema cache file
+# key: bump it whenever table_to_dict() adds or changes a field, so files
+# written by an older version are ignored instead of loaded without it.
+SCHEMA_CACHE_FORMAT = 2
+
+# Sync driver used for reflection, per async backend
+SYNC_DRIVERS = {
+    "postgresql": "postgresql+psycopg2",
+    "sqlite": "sqlite",
+}
+
 async def load_schema(engine: AsyncEngine) -> None:
     """
     Load all tables & columns from the DB into SCHEMA_CACHE.
@@ -15,7 +76,7 @@ async def load_schema(engine: AsyncEngine) -> None:
     For SQLite: Loads all tables
     """
 
-    global SCHEMA_CACHE
+    global SCHEMA_CACHE, SCHEMA_VERSION, TABLE_NAMES_TUPLE, TABLE_NAMES_SET, AVAILABLE_TABLES_CSV
 
     # Define schemas to load (for PostgreSQL)
     schemas_to_load = []
@@ -27,45 +88,200 @@ async def load_schema(engine: AsyncEngine) -> None:
         # SQLite: No schema concept
         schemas_to_load = [None]
 
-    # Load tables from each schema
-    for schema in schemas_to_load:
-        metadata = MetaData()
+    # Optional whitelist: ALLOWED_TABLES=crm_customers,orders
+    # Only these tables are reflected (skips catalog queries for the rest)
+    allowed_tables = [
+        name.strip()
+        for name in os.getenv("ALLOWED_TABLES", "").split(",")
+        if name.strip()
+    ]
+    
+    # Optional on-disk cache of the reflected schemas (SCHEMA_CACHE_FILE).
+    # Warm restarts against the same DB/schemas/whitelist skip reflection.
+    # Delete the file after DDL changes.
+    cache_file = os.getenv("SCHEMA_CACHE_FILE")
+    cache_key = _schema_cache_key(engine, schemas_to_load, allowed_tables)
+    cached = _read_schema_cache_file(cache_file, cache_key) if cache_file else None
+    
+    if cached is not None:
+        SCHEMA_CACHE.update(cached)
+    else:
+        # Reflect all schemas concurrently (each on its own thread and
+        # connection) so the catalog round-trips overlap, then merge in order
+        sync_engine = create_engine(_sync_url(engine.url), poolclass=NullPool)
+        try:
+            results = await asyncio.gather(*[
+                _reflect_one(sync_engine, schema, allowed_tables)
+                for schema in schemas_to_load
+            ])
+        finally:
+            sync_engine.dispose()
+        for tables in results:
+            SCHEMA_CACHE.update(tables)
+        
+        if cache_file:
+            _write_schema_cache_file(cache_file, cache_key, SCHEMA_CACHE)
+
+    TABLE_NAMES_TUPLE = tuple(SCHEMA_CACHE.keys())
+    TABLE_NAMES_SET = frozenset(TABLE_NAMES_TUPLE)
+    AVAILABLE_TABLES_CSV = ", ".join(sorted(TABLE_NAMES_TUPLE))
+    SCHEMA_VERSION += 1
+    SCHEMA_READY.set()
+
+def _sync_url(url: URL) -> URL:
+    """Swap the async driver (asyncpg/aiosqlite) for its sync counterpart."""
+    backend = url.get_backend_name()
+    return url.set(drivername=SYNC_DRIVERS.get(backend, backend))
+
+def _reflect_sync(sync_engine: Engine, schema: Optional[str], only) -> MetaData:
+    """Blocking reflection of one schema (runs on REFLECT_EXECUTOR)."""
+    metadata = MetaData()
+    with sync_engine.connect() as conn:
+        # table_to_dict() doesn't use foreign keys, so don't chase them into
+        # the referenced tables (saves constraint lookups per table)
+        metadata.reflect(
+            bind=conn,
+            schema=schema,
+            only=only,
+            views=False,
+            resolve_fks=False
+        )
+    return metadata
+
+async def _reflect_one(
+    sync_engine: Engine,
+    schema: Optional[str],
+    allowed_tables: List[str]
+) -> Dict[str, dict]:
+    """Reflect one DB schema and return {clean_table_name: table_dict}."""
+    
+    # A callable filter (rather than a list) so names that live in another
+    # schema don't make reflect() raise
+    only = (lambda name, _: name in allowed_tables) if allowed_tables else None
+    
+    loop = asyncio.get_running_loop()
+    metadata = await loop.run_in_executor(
+        REFLECT_EXECUTOR, _reflect_sync, sync_engine, schema, only
+    )
+
+    tables = {}
+    for table_name, table in metadata.tables.items():
+        # For PostgreSQL, table_name will be 'schema.table_name'
+        # Store both the full name and clean name
+        clean_name = table_name.split('.')[-1] if '.' in table_name else table_name
+        
+        table_dict = table_to_dict(table)
+        # Store the schema information
+        table_dict['schema'] = schema
+        table_dict['full_name'] = table_name
         
-        async with engine.begin() as conn:
-            await conn.run_sync(lambda sync_conn: metadata.reflect(
-                bind=sync_conn, 
-                schema=schema
-            ))
-
-        for table_name, table in metadata.tables.items():
-            # For PostgreSQL, table_name will be 'schema.table_name'
-            # Store both the full name and clean name
-            clean_name = table_name.split('.')[-1] if '.' in table_name else table_name
-            
-            table_dict = table_to_dict(table)
-            # Store the schema information
-            table_dict['schema'] = schema
-            table_dict['full_name'] = table_name
-            
-            SCHEMA_CACHE[clean_name] = table_dict
+        tables[clean_name] = table_dict
+    return tables
+
+def _schema_cache_key(
+    engine: AsyncEngine,
+    schemas: List[Optional[str]],
+    allowed_tables: List[str]
+) -> str:
+    """Hash of everything that determines what load_schema() reflects."""
+    raw = f"{SCHEMA_CACHE_FORMAT}|{engine.url}|{schemas}|{sorted(allowed_tables)}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+def _read_schema_cache_file(path: str, cache_key: str) -> Optional[Dict[str, dict]]:
+    """Return the pickled schemas if the file exists and matches cache_key."""
+    try:
+        with open(path, "rb") as f:
+            stored_key, schemas = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        # Truncated/corrupt pickle, or classes that no longer unpickle:
+        # reflect again (and overwrite the file)
+        logger.warning(f"Ignoring unreadable schema cache file {path}: {e}")
+        return None
+    
+    return schemas if stored_key == cache_key else None
+
+def _write_schema_cache_file(path: str, cache_key: str, schemas: Dict[str, dict]) -> None:
+    try:
+        with open(path, "wb") as f:
+            pickle.dump((cache_key, schemas), f)
+    except OSError as e:
+        logger.warning(f"Could not write schema cache file {path}: {e}")
 
 def table_to_dict(table) -> Dict[str, Any]:
     """Convert SQLAlchemy table into JSON-friendly dict"""
-    cols = []
-    for col in table.columns:
-        cols.append({
+    cols = [
+        {
             "name": col.name,
             "type": str(col.type),
             "nullable": col.nullable,
             "primary_key": col.primary_key,
-        })
+        }
+        for col in table.columns
+    ]
+    column_names = [col["name"] for col in cols]
     return {
         "table_name": table.name,
         "columns": cols,
+        # Derived lookups, built once here instead of on every request
+        "column_names": column_names,
+        "column_name_set": frozenset(column_names),
+        "similarity_index": build_similarity_index(column_names),
+        "schema_hash": compute_schema_hash(cols),
     }
 
+def compute_schema_hash(columns: List[Dict[str, Any]]) -> str:
+    """
+    Stable content hash of a column list (names, types, flags, order).
+    
+    Computed once per table at load time; column_planner keys its
+    formatted-prompt and plan caches on it, so two loads of an unchanged
+    table share entries and any DDL change misses them.
+    """
+    raw = "\n".join(
+        f"{col['name']}|{col['type']}|{col['nullable']}|{col['primary_key']}"
+        for col in columns
+    )
+    return hashlib.blake2b(raw.encode(), digest_size=8).hexdigest()
+
+def build_similarity_index(column_names: List[str]) -> Dict[str, List[int]]:
+    """
+    Map every 3+ char substring of each name segment to column positions.
+    
+    Used by column_matcher to suggest alternatives for missing columns with
+    one dict lookup per search term. Segments are the "_"/space separated
+    words of a name; search terms never contain "_" or spaces, so they can
+    only ever match inside one segment. Positions are ascending, no dupes.
+    """
+    index: Dict[str, List[int]] = {}
+    for pos, name in enumerate(column_names):
+        for segment in name.lower().replace("_", " ").split():
+            n = len(segment)
+            for i in range(n - 2):
+                for j in range(i + 3, n + 1):
+                    positions = index.setdefault(segment[i:j], [])
+                    if not positions or positions[-1] != pos:
+                        positions.append(pos)
+    return index
+
 def get_table_schema(table_name: str):
     return SCHEMA_CACHE.get(table_name)
 
-def list_tables():
-    return list(SCHEMA_CACHE.keys())
+def get_schema_or_404(table_name: str) -> Dict[str, Any]:
+    """
+    Validate and fetch in one dict lookup.
+    
+    Raises KeyError if the table isn't loaded; routes map that to a 404.
+    """
+    return SCHEMA_CACHE[table_name]
+
+def list_tables() -> Tuple[str, ...]:
+    return TABLE_NAMES_TUPLE
+
+def table_exists(table_name: str) -> bool:
+    return table_name in TABLE_NAMES_SET
+
+def shutdown_reflect_executor() -> None:
+    """Stop the reflection threads (called on app shutdown)."""
+    REFLECT_EXECUTOR.shutdown(wait=False, cancel_futures=True)
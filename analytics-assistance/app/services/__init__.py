@@ -1,3 +1,3 @@
 # This file makes 'services' a Python package
-# Allows: from app.services.prompts import COLUMN_PLANNER_PROMPT
+# Allows: from app.services.prompts import build_planner_messages
 
@@ -22,8 +22,9 @@ Example:
     - missing: ["created_at"]            ❌
 """
 
-from typing import Dict, List, Set, Any, Optional
+from typing import Dict, FrozenSet, List, Set, Any, Optional, Tuple
 from app.models.llm_models import ColumnPlanOutput
+from app.schemas.schema_registry import build_similarity_index
 import json
 
 
@@ -47,6 +48,18 @@ class ColumnMatchResult:
         recommendations: NEW - suggestions for handling missing data
     """
     
+    # One instance per analysis request; no per-instance __dict__
+    __slots__ = (
+        "technical_summary",
+        "required_columns",
+        "available_columns",
+        "missing_columns",
+        "optional_columns",
+        "assumptions",
+        "recommendations",
+        "sql_filters",
+    )
+    
     def __init__(
         self,
         technical_summary: str,
@@ -93,6 +106,66 @@ ColumnMatchResult [{status}]:
 """
 
 
+# ══════════════════════════════════════════════════════════════════
+# SCHEMA INDEX - Per-table lookups, built once and reused
+# ══════════════════════════════════════════════════════════════════
+
+class _SchemaIndex:
+    """
+    Lookup structures for one table schema.
+    
+    Built on first use and reused by every later match against the same
+    schema, so per-request work no longer scales with table width.
+    """
+    
+    __slots__ = ("columns", "column_names", "column_set", "_substrings")
+    
+    def __init__(
+        self,
+        columns: List[Dict[str, Any]],
+        column_set: Optional[FrozenSet[str]] = None,
+        substrings: Optional[Dict[str, List[int]]] = None
+    ):
+        # Kept to detect a reloaded schema (new list object → rebuild)
+        self.columns = columns
+        self.column_names: Tuple[str, ...] = tuple(col["name"] for col in columns)
+        self.column_set: FrozenSet[str] = column_set or frozenset(self.column_names)
+        self._substrings = substrings
+    
+    @property
+    def substrings(self) -> Dict[str, List[int]]:
+        """
+        Substring → column positions (see build_similarity_index).
+        
+        Registry schemas come with it precomputed at load time; otherwise
+        it is built here on first use.
+        """
+        if self._substrings is None:
+            self._substrings = build_similarity_index(self.column_names)
+        return self._substrings
+
+
+# table name → index for the currently loaded schema of that table
+_SCHEMA_INDEX_CACHE: Dict[str, _SchemaIndex] = {}
+
+
+def _get_schema_index(table_schema: Dict[str, Any]) -> _SchemaIndex:
+    columns = table_schema.get("columns", [])
+    key = table_schema.get("table_name", "")
+    
+    schema_index = _SCHEMA_INDEX_CACHE.get(key)
+    if schema_index is None or schema_index.columns is not columns:
+        # Worst case two threads build the same index; last one wins
+        # Registry schemas already carry these lookups; reuse them
+        schema_index = _SchemaIndex(
+            columns,
+            table_schema.get("column_name_set"),
+            table_schema.get("similarity_index")
+        )
+        _SCHEMA_INDEX_CACHE[key] = schema_index
+    return schema_index
+
+
 # ══════════════════════════════════════════════════════════════════
 # MAIN FUNCTION - Match columns
 # ══════════════════════════════════════════════════════════════════
@@ -126,26 +199,31 @@ def match_columns(
     
     # Step 1: Extract actual column names from schema
     # Schema format: {"columns": [{"name": "col1", ...}, {"name": "col2", ...}]}
-    actual_columns: Set[str] = {
-        col["name"] for col in table_schema.get("columns", [])
-    }
+    # (cached per schema, not rebuilt per request)
+    schema_index = _get_schema_index(table_schema)
+    actual_columns: FrozenSet[str] = schema_index.column_set
     
     # Step 2: Convert LLM's required columns to set for comparison
-    required_columns: Set[str] = set(llm_output.required_columns)
+    required_columns: FrozenSet[str] = frozenset(llm_output.required_columns)
     
     # Step 3: Set operations to find available and missing
     # Available = columns that exist in both required and actual
-    available_columns: Set[str] = required_columns & actual_columns  # Intersection
+    available_columns: FrozenSet[str] = required_columns & actual_columns  # Intersection
     
     # Missing = columns required but not in actual
-    missing_columns: Set[str] = required_columns - actual_columns  # Difference
+    missing_columns: FrozenSet[str] = required_columns - actual_columns  # Difference
+    
+    # Sorted once for consistency; reused by recommendations and the result
+    available_sorted = sorted(available_columns)
+    missing_sorted = sorted(missing_columns)
     
     # Step 4: Generate recommendations for missing columns
     recommendations = _generate_recommendations(
-        missing_columns=list(missing_columns),
-        available_columns=list(available_columns),
+        missing_columns=missing_sorted,
+        available_columns=available_sorted,
         optional_columns=llm_output.optional_columns,
-        actual_columns=list(actual_columns)
+        actual_columns=actual_columns,  # frozenset: O(1) membership
+        schema_index=schema_index
     )
     
     # Step 5: Parse sql_filters from JSON string to dict
@@ -162,8 +240,8 @@ def match_columns(
     return ColumnMatchResult(
         technical_summary=llm_output.technical_summary,
         required_columns=llm_output.required_columns,  # Keep original order
-        available_columns=sorted(list(available_columns)),  # Sort for consistency
-        missing_columns=sorted(list(missing_columns)),
+        available_columns=available_sorted,
+        missing_columns=missing_sorted,
         optional_columns=llm_output.optional_columns,
         assumptions=llm_output.assumptions,
         recommendations=recommendations,
@@ -179,7 +257,8 @@ def _generate_recommendations(
     missing_columns: List[str],
     available_columns: List[str],
     optional_columns: List[str],
-    actual_columns: List[str]
+    actual_columns: FrozenSet[str],
+    schema_index: _SchemaIndex
 ) -> List[str]:
     """
     Generate smart recommendations based on what's missing.
@@ -193,7 +272,8 @@ def _generate_recommendations(
         missing_columns: Columns required but not in table
         available_columns: Columns required and present
         optional_columns: Columns that would enhance analysis
-        actual_columns: All columns in the table
+        actual_columns: All columns in the table (set, for hashed lookups)
+        schema_index: Cached lookups for the table (similar-name search)
         
     Returns:
         List of recommendation strings
@@ -237,7 +317,7 @@ def _generate_recommendations(
     
     # Suggest alternatives: Look for similar column names
     for missing in missing_columns:
-        similar = _find_similar_columns(missing, actual_columns)
+        similar = _find_similar_columns(missing, schema_index)
         if similar:
             recommendations.append(
                 f"💡 For '{missing}', consider using: {', '.join(similar[:3])}"
@@ -256,7 +336,7 @@ def _generate_recommendations(
 # HELPER - Find similar column names (fuzzy matching)
 # ══════════════════════════════════════════════════════════════════
 
-def _find_similar_columns(missing_col: str, actual_columns: List[str]) -> List[str]:
+def _find_similar_columns(missing_col: str, schema_index: _SchemaIndex) -> List[str]:
     """
     Find columns in the table that might be alternatives to missing column.
     
@@ -267,33 +347,33 @@ def _find_similar_columns(missing_col: str, actual_columns: List[str]) -> List[s
     
     Args:
         missing_col: The column that's missing
-        actual_columns: All columns in the table
+        schema_index: Cached lookups for the table's columns
         
     Returns:
-        List of potentially similar column names
+        List of potentially similar column names, in table column order
         
     Example:
-        >>> _find_similar_columns("created_at", ["create_date", "updated_at", "name"])
-        ['create_date', 'updated_at']
+        >>> index = _SchemaIndex([{"name": "create_date"}, {"name": "total_created"}])
+        >>> _find_similar_columns("created_at", index)
+        ['total_created']
     """
     
-    similar = []
     missing_lower = missing_col.lower()
     
     # Extract key parts of the missing column name
     # "created_at" → ["created", "at"]
     missing_parts = missing_lower.replace("_", " ").split()
     
-    for actual_col in actual_columns:
-        actual_lower = actual_col.lower()
-        
-        # Check for substring matches
-        for part in missing_parts:
-            if len(part) > 2 and part in actual_lower:  # Only check meaningful parts
-                similar.append(actual_col)
-                break
+    # Substring matches via the precomputed index: one hash lookup per
+    # meaningful part instead of a scan over every column
+    substrings = schema_index.substrings
+    positions: Set[int] = set()
+    for part in missing_parts:
+        if len(part) > 2:  # Only check meaningful parts
+            positions.update(substrings.get(part, ()))
     
-    return similar
+    column_names = schema_index.column_names
+    return [column_names[pos] for pos in sorted(positions)]
 
 
 # ══════════════════════════════════════════════════════════════════
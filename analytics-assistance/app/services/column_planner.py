@@ -24,20 +24,44 @@ Example:
     )
 """
 
+import asyncio
+import json
+import logging
 import os
-from typing import Dict, Any
+import re
+import threading
+from collections import Counter
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple
 from dotenv import load_dotenv
 
+import httpx
+from openai import AsyncOpenAI
 from langchain_openai import ChatOpenAI
-from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.runnables import RunnableLambda
+from pydantic import BaseModel
 
-from app.models.llm_models import ColumnPlanOutput
-from app.services.prompts import COLUMN_PLANNER_PROMPT, format_columns_for_prompt
+from app.models.llm_models import ColumnPlanOutput, ColumnPlanBatchOutput
+from app.schemas.schema_registry import compute_schema_hash
+from app.services.llm_cache import LLMCache
+from app.services.rate_limiter import TokenBucket
+from app.services.prompts import (
+    build_planner_messages,
+    build_planner_batch_messages,
+    format_columns_for_prompt,
+    format_requirements_for_prompt
+)
+
+if TYPE_CHECKING:
+    from app.services.semantic_cache import SemanticCache
 
 
 # Load environment variables from .env file
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 
 # ══════════════════════════════════════════════════════════════════
 # CONFIGURATION - All cost optimization settings
@@ -54,18 +78,133 @@ DEFAULT_TEMPERATURE = float(os.getenv("OPENAI_TEMPERATURE", "0.1"))
 # Our JSON needs ~100-150 tokens, so 200 is safe
 DEFAULT_MAX_TOKENS = int(os.getenv("OPENAI_MAX_TOKENS", "200"))
 
+# Compact column list in the prompt ("name:type" lines instead of
+# "- name (TYPE, NOT NULL)"): fewer input tokens per request.
+# Set OPENAI_COMPACT_SCHEMA=0 to go back to the verbose format.
+COMPACT_SCHEMA = os.getenv("OPENAI_COMPACT_SCHEMA", "1") != "0"
+
+# Wide tables: send only the columns that look relevant to the requirement
+# (plus keys/timestamps, padded to PRUNE_KEEP_MIN) instead of the whole list.
+# Tables with at most PRUNE_MIN_COLUMNS columns are always sent whole, so
+# their prompt prefix stays identical across requests (and hits the API's
+# prompt cache); OPENAI_PRUNE_MIN_COLUMNS=0 disables pruning.
+PRUNE_MIN_COLUMNS = int(os.getenv("OPENAI_PRUNE_MIN_COLUMNS", "60"))
+PRUNE_KEEP_MIN = int(os.getenv("OPENAI_PRUNE_KEEP_MIN", "20"))
+
+# Answer trivially-structured requirements ("show me mrr", "average mrr by
+# industry") locally, without an LLM call. LOCAL_PLANNER=0 disables it.
+LOCAL_PLANNER = os.getenv("LOCAL_PLANNER", "1") != "0"
+
 # Timeout (don't wait forever for response)
 DEFAULT_TIMEOUT = 30  # seconds
 
+# Cap on a whole streamed reply. The HTTP timeout above is per read, so a
+# stream that keeps trickling tokens never trips it. A reply that overruns
+# is abandoned and retried (with backoff) up to LLM_TIMEOUT_RETRIES times.
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "30"))
+LLM_TIMEOUT_RETRIES = int(os.getenv("LLM_TIMEOUT_RETRIES", "2"))
+
+# Client-side cap on LLM requests per minute, per worker process. Requests
+# over it wait locally instead of being rejected with a 429 after a round
+# trip. 0 = no limit (rely on the API's limits and SDK retries).
+LLM_RATE_LIMIT_RPM = float(os.getenv("LLM_RATE_LIMIT_RPM", "0"))
+_RATE_LIMITER: Optional[TokenBucket] = (
+    TokenBucket(LLM_RATE_LIMIT_RPM) if LLM_RATE_LIMIT_RPM > 0 else None
+)
+
+# HTTP connection pool to the OpenAI API (per worker process).
+# Keep-alive connections skip the TCP/TLS handshake on every request.
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+# Seconds an idle connection stays open. httpx's 5s default drops the
+# connection between requests that are a few seconds apart.
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+
+# HTTP/2 multiplexes concurrent requests over one connection to the API
+# (needs the h2 package: httpx[http2]). LLM_HTTP2=0 falls back to HTTP/1.1.
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "1") != "0"
+
 
 # ══════════════════════════════════════════════════════════════════
 # LLM CLIENT - Configured for cost efficiency
 # ══════════════════════════════════════════════════════════════════
 
+# Event loop → its keep-alive connection pool. An httpx pool is bound to the
+# loop that first uses it, and this module runs on two: the app's loop and
+# the sync wrappers' background loop (see _get_sync_loop).
+_HTTP_CLIENTS: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+_HTTP_CLIENTS_LOCK = threading.Lock()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    The keep-alive connection pool for the running event loop.
+    
+    Every ChatOpenAI client on a loop shares it: the single-plan and batch
+    chains use different get_llm() configs, and with a shared pool they
+    reuse each other's connections instead of opening (and TLS-handshaking)
+    their own. Must be called from inside a running loop.
+    """
+    loop = asyncio.get_running_loop()
+    client = _HTTP_CLIENTS.get(loop)
+    if client is None:
+        with _HTTP_CLIENTS_LOCK:
+            client = _HTTP_CLIENTS.get(loop)
+            if client is None:
+                client = _HTTP_CLIENTS[loop] = httpx.AsyncClient(
+                    http2=LLM_HTTP2,
+                    limits=httpx.Limits(
+                        max_connections=LLM_MAX_CONNECTIONS,
+                        max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+                        keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+                    ),
+                    timeout=DEFAULT_TIMEOUT,
+                )
+    return client
+
+
+async def close_http_client() -> None:
+    """Close every loop's LLM connection pool (called on app shutdown)."""
+    with _HTTP_CLIENTS_LOCK:
+        clients = list(_HTTP_CLIENTS.items())
+        _HTTP_CLIENTS.clear()
+    
+    # Clients and chains built on the closed pools must not be reused
+    reload_llm()
+    
+    current = asyncio.get_running_loop()
+    for loop, client in clients:
+        if loop is current:
+            await client.aclose()
+        elif loop.is_running():
+            # Close it on the loop that owns it (e.g. the sync loop thread)
+            future = asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            try:
+                await asyncio.wait_for(asyncio.wrap_future(future), DEFAULT_TIMEOUT)
+            except Exception as e:
+                logger.warning("Could not close LLM connection pool: %s", e)
+        # A loop that's already closed took its connections with it
+
+
+def _openai_api_key() -> str:
+    """OPENAI_API_KEY, or a ValueError explaining how to set it."""
+    api_key = os.getenv("OPENAI_API_KEY")
+    
+    if not api_key:
+        raise ValueError(
+            "OPENAI_API_KEY not found in environment variables. "
+            "Please create a .env file with your API key. "
+            "See .env.example for template."
+        )
+    return api_key
+
+
+@lru_cache(maxsize=8)
 def get_llm(
     model: str = DEFAULT_MODEL,
     temperature: float = DEFAULT_TEMPERATURE,
     max_tokens: int = DEFAULT_MAX_TOKENS,
+    http_client: Optional[httpx.AsyncClient] = None,
 ) -> ChatOpenAI:
     """
     Create and configure OpenAI LLM client with cost optimization.
@@ -74,9 +213,14 @@ def get_llm(
         model: OpenAI model name (default: gpt-4o-mini for low cost)
         temperature: Randomness (0.0-1.0, lower = cheaper)
         max_tokens: Maximum response length (limits cost)
+        http_client: Async connection pool to use, normally
+            get_http_client() for the loop the client will run on
+            (None = the SDK builds its own)
         
     Returns:
-        Configured ChatOpenAI instance
+        Configured ChatOpenAI instance, cached per (model, temperature,
+        max_tokens, http_client) so its HTTP connection pool is reused
+        across calls
         
     Cost Optimization:
         - gpt-4o-mini: ~$0.0002 per request (RECOMMENDED)
@@ -84,18 +228,12 @@ def get_llm(
         - Token limit: Prevents expensive long responses
         
     Example:
-        >>> llm = get_llm()
+        >>> llm = get_llm(http_client=get_http_client())
         >>> # Uses gpt-4o-mini with temp=0.1, max_tokens=200
     """
     
-    api_key = os.getenv("OPENAI_API_KEY")
-    
-    if not api_key:
-        raise ValueError(
-            "OPENAI_API_KEY not found in environment variables. "
-            "Please create a .env file with your API key. "
-            "See .env.example for template."
-        )
+    # Read on first call per config; a missing key raises and is not cached
+    api_key = _openai_api_key()
     
     return ChatOpenAI(
         model=model,
@@ -103,9 +241,441 @@ def get_llm(
         max_tokens=max_tokens,
         timeout=DEFAULT_TIMEOUT,
         api_key=api_key,
+        http_async_client=http_client,
+    )
+
+
+@lru_cache(maxsize=8)
+def _json_llm(max_tokens: int, http_client: httpx.AsyncClient):
+    """
+    get_llm() in JSON mode on a given loop's pool, built once per pair.
+    
+    JSON mode instead of with_structured_output(): the prompt already spells
+    out the JSON shape, so we skip sending the tool/function schema on every
+    call and the response comes back as plain JSON, not a tool call.
+    """
+    return get_llm(max_tokens=max_tokens, http_client=http_client).bind(
+        response_format={"type": "json_object"}
+    )
+
+
+# Where warm_up_llm() opens its connection (same env var the SDK reads)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+
+
+async def warm_up_llm() -> None:
+    """
+    Build the running loop's LLM clients and open a pooled API connection.
+    
+    Call from the loop that will serve requests (clients and pools are per
+    loop), e.g. the app lifespan. The first request then skips client
+    construction and the TCP/TLS handshake. A failed connection is only
+    logged; requests open their own as usual.
+    
+    Raises:
+        ValueError: If OPENAI_API_KEY is missing
+    """
+    http_client = get_http_client()
+    _json_llm(DEFAULT_MAX_TOKENS, http_client)
+    _json_llm(DEFAULT_MAX_TOKENS * BATCH_SIZE, http_client)
+    
+    # Cheap authenticated request; the connection stays in the pool
+    try:
+        await http_client.get(
+            f"{OPENAI_BASE_URL}/models",
+            headers={"Authorization": f"Bearer {_openai_api_key()}"}
+        )
+    except httpx.HTTPError as e:
+        logger.warning("LLM connection warm-up failed: %s", e)
+
+
+# Errors that mean the API key is missing or wrong: "api_key" from client
+# setup, "Incorrect API key provided" from a 401
+_API_KEY_ERROR_RE = re.compile(r"api[_ ]key", re.I)
+
+# Characters that can change _stream_json_object()'s parse state
+_JSON_STRUCTURE_RE = re.compile(r'["{}\\]')
+
+# First {...} span in a response, for replies wrapped in prose or ```json
+_JSON_OBJECT_RE = re.compile(r"\{.*\}", re.S)
+
+
+def _validate_json(model: type[BaseModel], message: BaseMessage):
+    """
+    Parse an LLM reply straight into a Pydantic model.
+    
+    model_validate_json() parses and validates in one pass in pydantic-core
+    (no intermediate dict from json.loads). JSON mode replies are bare JSON;
+    anything else is retried on the outermost {...} span.
+    """
+    content = message.content
+    try:
+        return model.model_validate_json(content)
+    except ValueError:
+        match = _JSON_OBJECT_RE.search(content)
+        if match is None:
+            raise
+        return model.model_validate_json(match.group(0))
+
+
+def _parse_plan(message: BaseMessage) -> ColumnPlanOutput:
+    return _validate_json(ColumnPlanOutput, message)
+
+
+def _parse_plan_batch(message: BaseMessage) -> ColumnPlanBatchOutput:
+    return _validate_json(ColumnPlanBatchOutput, message)
+
+
+async def _stream_json_object(llm, messages: List[BaseMessage]) -> AIMessage:
+    """
+    Stream a reply and stop reading as soon as its top-level JSON object closes.
+    
+    JSON mode can pad the object with whitespace up to max_tokens, and other
+    models may trail it with prose; closing the stream early drops the HTTP
+    response so we neither wait for nor pay for those tokens. Braces inside
+    JSON strings are skipped by a small string/escape state machine.
+    """
+    parts: List[str] = []
+    depth = 0
+    in_string = escaped = False
+    
+    stream = llm.astream(messages)
+    try:
+        async for chunk in stream:
+            text = chunk.content
+            if not text:
+                continue
+            # Only quotes, braces and backslashes change the state, so visit
+            # just those (most chunks are plain words and have none)
+            skip = 0 if escaped else -1  # index of a char escaped by "\\"
+            escaped = False
+            for match in _JSON_STRUCTURE_RE.finditer(text):
+                i = match.start()
+                if i == skip:
+                    continue
+                ch = text[i]
+                if in_string:
+                    if ch == "\\":
+                        # Escapes the next char, possibly in the next chunk
+                        skip = i + 1
+                        escaped = skip == len(text)
+                    elif ch == '"':
+                        in_string = False
+                elif ch == '"':
+                    in_string = True
+                elif ch == "{":
+                    depth += 1
+                elif ch == "}" and depth:
+                    depth -= 1
+                    if depth == 0:
+                        parts.append(text[:i + 1])
+                        return AIMessage(content="".join(parts))
+            parts.append(text)
+    finally:
+        await stream.aclose()
+    
+    # Stream ended without closing the object; let the parser report it
+    return AIMessage(content="".join(parts))
+
+
+async def _stream_with_deadline(
+    llm,
+    messages: List[BaseMessage],
+    timeout: float
+) -> AIMessage:
+    """
+    _stream_json_object() with an overall deadline per attempt.
+    
+    Stalled upstream requests sit in the latency tail; cutting them off and
+    re-issuing is usually faster than waiting them out.
+    """
+    for attempt in range(LLM_TIMEOUT_RETRIES + 1):
+        # Outside the deadline: time spent queued isn't the upstream's fault
+        if _RATE_LIMITER is not None:
+            await _RATE_LIMITER.acquire()
+        try:
+            return await asyncio.wait_for(_stream_json_object(llm, messages), timeout)
+        except asyncio.TimeoutError:
+            if attempt == LLM_TIMEOUT_RETRIES:
+                raise
+            logger.warning("LLM reply exceeded %.0fs; retrying (attempt %d)", timeout, attempt + 2)
+            await asyncio.sleep(0.5 * 2 ** attempt)
+
+
+@lru_cache(maxsize=1)
+def get_chain():
+    """
+    Build the prompt → LLM → structured-output chain once per process.
+    
+    The chain is stateless between calls, so every plan_columns() call
+    reuses the same instance. The ChatOpenAI client is looked up per call
+    for the running loop (see _json_llm), since its connection pool can't
+    be shared between loops. Called during app startup so a missing key is
+    reported before the first request.
+    
+    Raises:
+        ValueError: If OPENAI_API_KEY is missing (nothing is cached)
+    """
+    _openai_api_key()
+    
+    async def _reply(messages: List[BaseMessage]) -> AIMessage:
+        llm = _json_llm(DEFAULT_MAX_TOKENS, get_http_client())
+        return await _stream_with_deadline(llm, messages, LLM_REQUEST_TIMEOUT)
+    
+    # prompt → llm (streamed, stops at the closing brace) → validation
+    return RunnableLambda(build_planner_messages) | RunnableLambda(_reply) | _parse_plan
+
+
+def reload_llm() -> None:
+    """
+    Drop the cached LLM clients and chains.
+    
+    The next call rebuilds them, re-reading OPENAI_API_KEY (e.g. after a
+    key rotation). Cached plans stay valid: their keys include the model.
+    """
+    get_llm.cache_clear()
+    _json_llm.cache_clear()
+    get_chain.cache_clear()
+    get_batch_chain.cache_clear()
+
+# ══════════════════════════════════════════════════════════════════
+# RESULT CACHE - Skip the LLM for requirements already answered
+# ══════════════════════════════════════════════════════════════════
+
+# Max number of cached plans per worker (least recently used are evicted)
+PLAN_RESULT_CACHE_SIZE = int(os.getenv("PLAN_CACHE_SIZE", "1024"))
+
+# Seconds a cached plan stays valid (0 = until evicted)
+PLAN_CACHE_TTL = float(os.getenv("PLAN_CACHE_TTL", "3600"))
+
+# (model, temperature, table_name, column-set hash, normalized requirement)
+# -> plan. ColumnPlanOutput is frozen, so one instance can be returned to
+# many callers. Only successfully parsed results are stored.
+_PLAN_CACHE = LLMCache(maxsize=PLAN_RESULT_CACHE_SIZE, ttl=PLAN_CACHE_TTL)
+
+# "hits"/"semantic_hits"/"misses" of the plan caches, for observability
+PLAN_CACHE_STATS: Counter = Counter()
+
+# Paraphrase-tolerant second level, consulted on exact-cache misses.
+# Opt-in: SEMANTIC_CACHE=1 (costs one embeddings call per miss).
+# Imported only when enabled, so the default setup doesn't load numpy or
+# the embeddings client.
+_SEMANTIC_CACHE: Optional["SemanticCache"] = None
+if os.getenv("SEMANTIC_CACHE") == "1":
+    from app.services.semantic_cache import SemanticCache
+    _SEMANTIC_CACHE = SemanticCache()
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_requirement(user_requirement: str) -> str:
+    """
+    Canonical form of a requirement for cache keys.
+    
+    Case and whitespace differences ("Show MRR " vs "show  mrr") don't
+    change what the LLM is asked, so they map to the same key.
+    """
+    return _WHITESPACE_RE.sub(" ", user_requirement.strip().lower())
+
+
+# schema hash → formatted prompt text (formatting depends only on the columns)
+_COLUMNS_FORMATTED_CACHE: Dict[str, str] = {}
+
+
+def _schema_hash(table_schema: Dict[str, Any]) -> str:
+    """
+    Content hash of a schema's columns.
+    
+    Registry schemas carry it from load time; anything else (e.g. a schema
+    cache file written before the field existed) gets it computed once and
+    stashed on the dict.
+    """
+    schema_hash = table_schema.get("schema_hash")
+    if schema_hash is None:
+        schema_hash = compute_schema_hash(table_schema["columns"])
+        table_schema["schema_hash"] = schema_hash
+    return schema_hash
+
+
+def _columns_formatted(table_name: str, table_schema: Dict[str, Any]) -> str:
+    """
+    format_columns_for_prompt() for a schema, built once per schema hash.
+    
+    Reloading an unchanged table reuses the entry; a changed one misses it.
+    """
+    schema_hash = _schema_hash(table_schema)
+    formatted = _COLUMNS_FORMATTED_CACHE.get(schema_hash)
+    if formatted is None:
+        formatted = format_columns_for_prompt(table_schema["columns"], compact=COMPACT_SCHEMA)
+        _COLUMNS_FORMATTED_CACHE[schema_hash] = formatted
+    return formatted
+
+
+def _plan_cache_key(
+    table_name: str,
+    table_schema: Dict[str, Any],
+    user_requirement: str
+) -> Tuple[str, float, str, str, str]:
+    # Model settings are part of the key so a config change never serves
+    # plans produced by a different model
+    return (
+        DEFAULT_MODEL,
+        DEFAULT_TEMPERATURE,
+        table_name,
+        _schema_hash(table_schema),
+        normalize_requirement(user_requirement)
     )
 
 
+# ══════════════════════════════════════════════════════════════════
+# LOCAL PLANNER - No LLM call for requirements that name their columns
+# ══════════════════════════════════════════════════════════════════
+
+# Whole-requirement patterns only (after normalize_requirement()); anything
+# with more structure than this goes to the LLM
+_SHOW_RE = re.compile(r"^(?:show(?: me)?|list|get) (\w+)$")
+_AGGREGATE_RE = re.compile(
+    r"^(avg|average|mean|sum|total|count|max|maximum|min|minimum) (?:of )?(\w+)(?: by (\w+))?$"
+)
+
+_AGGREGATE_NAMES = {
+    "avg": "average", "mean": "average", "total": "sum",
+    "maximum": "max", "minimum": "min",
+}
+
+# "hits"/"misses" of the local planner, for observability
+LOCAL_PLAN_STATS: Counter = Counter()
+
+
+def _try_local_plan(
+    user_requirement: str,
+    table_schema: Dict[str, Any]
+) -> Optional[ColumnPlanOutput]:
+    """
+    Plan "show me <col>" / "<agg> <col> [by <col>]" requirements locally.
+    
+    Returns None (→ ask the LLM) unless the requirement matches a pattern
+    exactly and every named column exists in the table.
+    """
+    requirement = normalize_requirement(user_requirement)
+    column_names = table_schema.get("column_name_set") or frozenset(
+        col["name"] for col in table_schema["columns"]
+    )
+    
+    plan = None
+    match = _SHOW_RE.match(requirement)
+    if match and match.group(1) in column_names:
+        column = match.group(1)
+        plan = ColumnPlanOutput(
+            technical_summary=f"Select {column}",
+            required_columns=[column],
+            assumptions="Matched local rule: show <column>"
+        )
+    
+    match = None if plan else _AGGREGATE_RE.match(requirement)
+    if match:
+        func, column, group_by = match.groups()
+        func = _AGGREGATE_NAMES.get(func, func)
+        required = [column] if group_by is None else [column, group_by]
+        if column_names.issuperset(required):
+            summary = f"Calculate {func} of {column}"
+            if group_by:
+                summary += f", grouped by {group_by}"
+            plan = ColumnPlanOutput(
+                technical_summary=summary,
+                required_columns=required,
+                assumptions="Matched local rule: <aggregate> <column> [by <column>]"
+            )
+    
+    LOCAL_PLAN_STATS["hits" if plan else "misses"] += 1
+    return plan
+
+
+# ══════════════════════════════════════════════════════════════════
+# SCHEMA PRUNING - Smaller prompts for wide tables
+# ══════════════════════════════════════════════════════════════════
+
+# Words of a requirement or column name ("_" separates words)
+_WORD_RE = re.compile(r"[a-z][a-z0-9]*")
+
+# Shorter words ("id", "by", "of") match too many columns to be useful
+_PRUNE_MIN_WORD_LEN = 3
+
+# Kept (after direct matches) when padding up to keep_min: likely join keys
+# and date-filter columns
+_TIME_TYPE_MARKERS = ("DATE", "TIME")
+
+
+def _singular(word: str) -> str:
+    # "orders" → "order", but keep "status", "address", "analysis"
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def _prune_columns(
+    columns: List[Dict[str, Any]],
+    user_requirement: str,
+    keep_min: int = PRUNE_KEEP_MIN
+) -> List[Dict[str, Any]]:
+    """
+    Keep the columns a requirement plausibly refers to.
+    
+    A column matches when one of its words equals a requirement word,
+    ignoring a plural "s" ("mrr" ↔ "mrr", "revenue" ↔ "total_revenue",
+    "orders" ↔ "order_count"). Words shorter than 3 characters never match,
+    so "id" doesn't pull in every *_id column. Matches are always kept;
+    primary keys and date/time columns, then the rest in table order, pad
+    the result to keep_min.
+    
+    Returns:
+        The kept columns in table order, or `columns` itself when pruning
+        would drop 25% or less (not worth the risk of hiding a column)
+    """
+    words = {
+        _singular(w) for w in _WORD_RE.findall(user_requirement.lower())
+        if len(w) >= _PRUNE_MIN_WORD_LEN
+    }
+    
+    matched, preferred, rest = [], [], []
+    for pos, col in enumerate(columns):
+        col_words = {
+            _singular(w) for w in _WORD_RE.findall(col["name"].lower())
+            if len(w) >= _PRUNE_MIN_WORD_LEN
+        }
+        if not words.isdisjoint(col_words):
+            matched.append(pos)
+        elif col["primary_key"] or any(m in col["type"].upper() for m in _TIME_TYPE_MARKERS):
+            preferred.append(pos)
+        else:
+            rest.append(pos)
+    
+    keep = set(matched)
+    for pos in preferred + rest:
+        if len(keep) >= keep_min:
+            break
+        keep.add(pos)
+    
+    if len(keep) * 4 >= len(columns) * 3:
+        return columns
+    return [col for pos, col in enumerate(columns) if pos in keep]
+
+
+def _pruned_columns_formatted(
+    table_schema: Dict[str, Any],
+    user_requirement: str
+) -> Optional[str]:
+    """Formatted pruned column list, or None if the full list should be sent."""
+    columns = table_schema["columns"]
+    if not PRUNE_MIN_COLUMNS or len(columns) <= PRUNE_MIN_COLUMNS:
+        return None
+    
+    pruned = _prune_columns(columns, user_requirement)
+    if pruned is columns:
+        return None
+    return format_columns_for_prompt(pruned, compact=COMPACT_SCHEMA)
+
+
 # ══════════════════════════════════════════════════════════════════
 # MAIN FUNCTION - Analyze columns needed for requirement
 # ══════════════════════════════════════════════════════════════════
@@ -162,8 +732,34 @@ async def plan_columns(
     if not table_schema or "columns" not in table_schema:
         raise ValueError("table_schema must contain 'columns' key")
     
-    # Step 1: Format columns for prompt
-    columns_formatted = format_columns_for_prompt(table_schema["columns"])
+    # Requirement that just names its columns: no LLM needed
+    if LOCAL_PLANNER:
+        local_plan = _try_local_plan(user_requirement, table_schema)
+        if local_plan is not None:
+            return local_plan
+    
+    # Same requirement against the same columns: reuse the earlier answer
+    cache_key = _plan_cache_key(table_name, table_schema, user_requirement)
+    cached = _PLAN_CACHE.get(cache_key)
+    if cached is not None:
+        PLAN_CACHE_STATS["hits"] += 1
+        return cached
+    
+    # Paraphrase of an earlier requirement (scope = key minus requirement)
+    semantic_vector = None
+    if _SEMANTIC_CACHE is not None:
+        cached, semantic_vector = await _SEMANTIC_CACHE.lookup(cache_key[:-1], user_requirement)
+        if cached is not None:
+            PLAN_CACHE_STATS["semantic_hits"] += 1
+            _PLAN_CACHE.set(cache_key, cached)
+            return cached
+    
+    PLAN_CACHE_STATS["misses"] += 1
+    
+    # Step 1: Format columns for prompt (cached per schema); wide tables
+    # are pruned to the columns relevant to this requirement
+    columns_formatted = _columns_formatted(table_name, table_schema)
+    pruned_formatted = _pruned_columns_formatted(table_schema, user_requirement)
     
     if verbose:
         print(f"\n{'='*60}")
@@ -175,29 +771,37 @@ async def plan_columns(
         print(f"Model: {DEFAULT_MODEL}")
         print(f"{'='*60}\n")
     
-    # Step 2: Create LLM with structured output
-    llm = get_llm()
-    
-    # with_structured_output() tells LangChain:
-    # "Parse the response and validate against ColumnPlanOutput model"
-    structured_llm = llm.with_structured_output(ColumnPlanOutput)
-    
-    # Step 3: Create the chain (prompt → llm → validation)
-    chain = COLUMN_PLANNER_PROMPT | structured_llm
+    # Step 2-3: Get the (cached) chain: prompt → llm → validation
+    chain = get_chain()
     
     # Step 4: Invoke the chain
     try:
         result = await chain.ainvoke({
             "table_name": table_name,
-            "columns_formatted": columns_formatted,
+            "columns_formatted": pruned_formatted or columns_formatted,
+            "columns_pruned": pruned_formatted is not None,
             "user_requirement": user_requirement
         })
         
+        # The pruned list hid something the LLM went looking for: ask again
+        # with every column so it can pick the real alternative
+        if pruned_formatted is not None:
+            column_names = table_schema.get("column_name_set") or frozenset(
+                col["name"] for col in table_schema["columns"]
+            )
+            if not column_names.issuperset(result.required_columns):
+                logger.info("Pruned schema missed required columns for %s; retrying with full schema", table_name)
+                result = await chain.ainvoke({
+                    "table_name": table_name,
+                    "columns_formatted": columns_formatted,
+                    "user_requirement": user_requirement
+                })
+        
         # Step 5: Log token usage if verbose
         if verbose:
             # Note: In production, you'd track this from the response
             # For now, we estimate based on typical usage
-            estimated_input_tokens = 500 + (len(table_schema["columns"]) * 10)
+            estimated_input_tokens = 500 + len(pruned_formatted or columns_formatted) // 4  # ~4 chars/token
             estimated_output_tokens = 150
             
             # Calculate cost (gpt-4o-mini pricing)
@@ -213,22 +817,403 @@ async def plan_columns(
             print(f"Total cost:    ~${total_cost:.6f} (${total_cost*1000:.4f} per 1000 requests)")
             print(f"{'='*60}\n")
         
+        _PLAN_CACHE.set(cache_key, result)
+        if semantic_vector is not None:
+            _SEMANTIC_CACHE.add(cache_key[:-1], semantic_vector, result)
+        
         return result
         
     except Exception as e:
         # Better error messages
-        if "api_key" in str(e).lower():
+        error_text = str(e)
+        if _API_KEY_ERROR_RE.search(error_text):
             raise ValueError(
                 "Invalid OpenAI API key. Please check your .env file."
             ) from e
         
-        raise Exception(f"LLM call failed: {str(e)}") from e
+        raise Exception(f"LLM call failed: {error_text}") from e
+
+
+# ══════════════════════════════════════════════════════════════════
+# BATCH FUNCTION - Several requirements against one table
+# ══════════════════════════════════════════════════════════════════
+
+# Max LLM calls in flight for a single plan_columns_batch() call
+BATCH_MAX_CONCURRENCY = 8
+
+# Requirements answered per LLM call by plan_columns_batch(). The system
+# prompt and column list dominate input tokens, so sharing them across a
+# batch cuts cost roughly by this factor.
+BATCH_SIZE = int(os.getenv("OPENAI_BATCH_SIZE", "6"))
+
+
+@lru_cache(maxsize=1)
+def get_batch_chain():
+    """
+    Build the multi-requirement chain once per process (see get_chain).
+    
+    The response holds up to BATCH_SIZE analyses, so max_tokens scales too.
+    """
+    _openai_api_key()
+    
+    async def _reply(messages: List[BaseMessage]) -> AIMessage:
+        llm = _json_llm(DEFAULT_MAX_TOKENS * BATCH_SIZE, get_http_client())
+        # Generation time grows with the number of answers in the reply
+        return await _stream_with_deadline(llm, messages, LLM_REQUEST_TIMEOUT * BATCH_SIZE)
+    
+    return RunnableLambda(build_planner_batch_messages) | RunnableLambda(_reply) | _parse_plan_batch
+
+
+async def _plan_chunk(
+    table_name: str,
+    columns_formatted: str,
+    requirements: List[str]
+) -> List[ColumnPlanOutput]:
+    """
+    Plan up to BATCH_SIZE requirements with one LLM call.
+    
+    Falls back to one call per requirement if the batched call fails or
+    returns the wrong number of results, so one bad batch never loses
+    the whole chunk.
+    """
+    if len(requirements) > 1:
+        try:
+            output = await get_batch_chain().ainvoke({
+                "table_name": table_name,
+                "columns_formatted": columns_formatted,
+                "requirements_formatted": format_requirements_for_prompt(requirements)
+            })
+            if len(output.results) == len(requirements):
+                return output.results
+            logger.warning(
+                "Batch plan returned %d results for %d requirements; retrying individually",
+                len(output.results), len(requirements)
+            )
+        except Exception as e:
+            logger.warning("Batch plan failed (%s); retrying individually", e)
+    
+    return await get_chain().abatch(
+        [
+            {
+                "table_name": table_name,
+                "columns_formatted": columns_formatted,
+                "user_requirement": requirement
+            }
+            for requirement in requirements
+        ],
+        config={"max_concurrency": BATCH_MAX_CONCURRENCY}
+    )
+
+
+async def plan_columns_batch(
+    table_name: str,
+    table_schema: Dict[str, Any],
+    user_requirements: List[str]
+) -> List[ColumnPlanOutput]:
+    """
+    Analyze several requirements against the same table.
+    
+    Cached requirements are answered without the LLM. The rest are sent
+    BATCH_SIZE at a time in a single prompt (system prompt and columns
+    sent once per batch); batches run concurrently.
+    
+    Args:
+        table_name: Name of the table being analyzed
+        table_schema: Schema dict from schema_registry.get_table_schema()
+        user_requirements: Natural language requirements (e.g. dashboard cards)
+        
+    Returns:
+        One ColumnPlanOutput per requirement, in the same order
+        
+    Raises:
+        ValueError: If API key missing or invalid input
+        Exception: If any LLM call fails
+    """
+    
+    if not table_name:
+        raise ValueError("table_name cannot be empty")
+    
+    if any(not r or r.strip() == "" for r in user_requirements):
+        raise ValueError("user_requirement cannot be empty")
+    
+    if not table_schema or "columns" not in table_schema:
+        raise ValueError("table_schema must contain 'columns' key")
+    
+    results: List[Any] = [None] * len(user_requirements)
+    pending: List[Tuple[int, Tuple]] = []
+    
+    # Answer what we can from the cache
+    for i, requirement in enumerate(user_requirements):
+        cache_key = _plan_cache_key(table_name, table_schema, requirement)
+        cached = _PLAN_CACHE.get(cache_key)
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending.append((i, cache_key))
+    
+    PLAN_CACHE_STATS["hits"] += len(user_requirements) - len(pending)
+    PLAN_CACHE_STATS["misses"] += len(pending)
+    
+    if not pending:
+        return results
+    
+    # Shared by every input in the batch
+    columns_formatted = _columns_formatted(table_name, table_schema)
+    
+    pending_requirements = [user_requirements[i] for i, _ in pending]
+    
+    try:
+        chunk_outputs = await asyncio.gather(*(
+            _plan_chunk(
+                table_name,
+                columns_formatted,
+                pending_requirements[start:start + BATCH_SIZE]
+            )
+            for start in range(0, len(pending_requirements), BATCH_SIZE)
+        ))
+    except Exception as e:
+        error_text = str(e)
+        if _API_KEY_ERROR_RE.search(error_text):
+            raise ValueError(
+                "Invalid OpenAI API key. Please check your .env file."
+            ) from e
+        
+        raise Exception(f"LLM call failed: {error_text}") from e
+    
+    outputs = [output for chunk in chunk_outputs for output in chunk]
+    
+    for (i, cache_key), output in zip(pending, outputs):
+        results[i] = output
+        _PLAN_CACHE.set(cache_key, output)
+    
+    return results
+
+
+# ══════════════════════════════════════════════════════════════════
+# CONCURRENT FAN-OUT - Many independent requirements (any tables)
+# ══════════════════════════════════════════════════════════════════
+
+# Max plan_columns() calls in flight for one plan_columns_many() call;
+# keeps large fan-outs under the provider's rate limit
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "50"))
+
+
+async def plan_columns_many(
+    items: List[Tuple[str, Dict[str, Any], str]],
+    max_concurrency: int = LLM_MAX_CONCURRENCY
+) -> List[Any]:
+    """
+    Run plan_columns() for many (table_name, table_schema, requirement)
+    items concurrently, at most max_concurrency at a time.
+    
+    The calls are network-bound, so N plans take about as long as the
+    slowest one instead of the sum of all of them.
+    
+    Returns:
+        One entry per item, in order: a ColumnPlanOutput, or the exception
+        that item raised (one failure doesn't discard the other results)
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def _plan_one(table_name: str, table_schema: Dict[str, Any], requirement: str):
+        async with semaphore:
+            return await plan_columns(table_name, table_schema, requirement)
+    
+    return await asyncio.gather(
+        *(_plan_one(*item) for item in items),
+        return_exceptions=True
+    )
+
+
+# ══════════════════════════════════════════════════════════════════
+# PREFETCH - Warm the plan cache with frequently asked requirements
+# ══════════════════════════════════════════════════════════════════
+
+# Prefetch runs alongside live traffic; keep its share of the API small
+PREFETCH_MAX_CONCURRENCY = int(os.getenv("PLAN_PREFETCH_CONCURRENCY", "4"))
+
+
+async def prefetch_plans(items: List[Tuple[str, Dict[str, Any], str]]) -> int:
+    """
+    Plan (table_name, table_schema, requirement) items ahead of time so the
+    first user to ask them hits the cache instead of waiting on the LLM.
+    
+    Plans land in the exact cache (and the semantic cache, if enabled, so
+    paraphrases hit too) and expire with PLAN_CACHE_TTL like any other.
+    Failures are logged, not raised: prefetching is best-effort.
+    
+    Returns:
+        Number of items that now have a cached plan
+    """
+    results = await plan_columns_many(items, PREFETCH_MAX_CONCURRENCY)
+    failed = [r for r in results if isinstance(r, Exception)]
+    if failed:
+        logger.warning("Prefetch: %d of %d plans failed (first: %s)", len(failed), len(items), failed[0])
+    return len(results) - len(failed)
+
+
+# ══════════════════════════════════════════════════════════════════
+# OFFLINE FUNCTION - OpenAI Batch API for non-urgent bulk planning
+# ══════════════════════════════════════════════════════════════════
+
+# Seconds between status checks while a batch job runs
+BATCH_API_POLL_INTERVAL = 30
+
+# OpenAI expires jobs that haven't finished within this window
+BATCH_API_COMPLETION_WINDOW = "24h"
+
+_BATCH_API_DONE = frozenset({"completed", "failed", "expired", "cancelled"})
+
+# LangChain message type → OpenAI chat role
+_OPENAI_ROLES = {"system": "system", "human": "user", "ai": "assistant"}
+
+
+async def plan_columns_offline(
+    items: List[Tuple[str, Dict[str, Any], str]],
+    poll_interval: float = BATCH_API_POLL_INTERVAL
+) -> List[Any]:
+    """
+    Run plan_columns() for many (table_name, table_schema, requirement)
+    items through the OpenAI Batch API.
+    
+    Batch requests cost about half the interactive price but finish
+    asynchronously (minutes, up to BATCH_API_COMPLETION_WINDOW), so this is
+    for scheduled/bulk jobs such as nightly refreshes or evals, never for a
+    request path. Cached plans are returned without being submitted, and
+    new plans are cached like plan_columns() results.
+    
+    Returns:
+        Same as plan_columns_many(): one entry per item, in order, either a
+        ColumnPlanOutput or the exception for that item
+    """
+    results: List[Any] = [None] * len(items)
+    pending: Dict[str, Tuple[int, tuple]] = {}
+    lines: List[str] = []
+    
+    for i, (table_name, table_schema, requirement) in enumerate(items):
+        cache_key = _plan_cache_key(table_name, table_schema, requirement)
+        cached = _PLAN_CACHE.get(cache_key)
+        if cached is not None:
+            PLAN_CACHE_STATS["hits"] += 1
+            results[i] = cached
+            continue
+        PLAN_CACHE_STATS["misses"] += 1
+        
+        messages = build_planner_messages({
+            "table_name": table_name,
+            "columns_formatted": _columns_formatted(table_name, table_schema),
+            "user_requirement": requirement
+        })
+        custom_id = str(i)
+        pending[custom_id] = (i, cache_key)
+        lines.append(json.dumps({
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": DEFAULT_MODEL,
+                "temperature": DEFAULT_TEMPERATURE,
+                "max_tokens": DEFAULT_MAX_TOKENS,
+                "response_format": {"type": "json_object"},
+                "messages": [
+                    {"role": _OPENAI_ROLES[m.type], "content": m.content}
+                    for m in messages
+                ],
+            },
+        }))
+    
+    if not lines:
+        return results
+    
+    async with AsyncOpenAI() as client:
+        batch_file = await client.files.create(
+            file=("column_plans.jsonl", "\n".join(lines).encode()),
+            purpose="batch"
+        )
+        batch = await client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window=BATCH_API_COMPLETION_WINDOW
+        )
+        logger.info("Submitted batch %s with %d plans", batch.id, len(lines))
+        
+        while batch.status not in _BATCH_API_DONE:
+            await asyncio.sleep(poll_interval)
+            batch = await client.batches.retrieve(batch.id)
+        
+        # Successful requests land in the output file, failed ones in the
+        # error file; expired/cancelled jobs can still have both (partial)
+        output_lines: List[str] = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                output_lines.extend((await client.files.content(file_id)).text.splitlines())
+    
+    if batch.status != "completed":
+        logger.warning("Batch %s ended as '%s'", batch.id, batch.status)
+    
+    for line in output_lines:
+        record = json.loads(line)
+        entry = pending.pop(record.get("custom_id"), None)
+        if entry is None:
+            continue
+        i, cache_key = entry
+        response = record.get("response") or {}
+        if record.get("error") or response.get("status_code") != 200:
+            results[i] = Exception(f"LLM call failed: {record.get('error') or response.get('body')}")
+            continue
+        
+        content = response["body"]["choices"][0]["message"]["content"]
+        try:
+            plan = _parse_plan(AIMessage(content=content))
+        except ValueError as e:
+            results[i] = e
+            continue
+        _PLAN_CACHE.set(cache_key, plan)
+        results[i] = plan
+    
+    # Requests in neither file: the job failed validation, or expired or
+    # was cancelled before running them
+    batch_errors = getattr(batch, "errors", None)
+    error_detail = "; ".join(
+        e.message for e in (batch_errors.data or []) if getattr(e, "message", None)
+    ) if batch_errors else ""
+    for i, _ in pending.values():
+        results[i] = Exception(
+            f"Batch {batch.id} ended as '{batch.status}' without a result for this plan"
+            + (f": {error_detail}" if error_detail else "")
+        )
+    
+    return results
 
 
 # ══════════════════════════════════════════════════════════════════
 # SYNCHRONOUS WRAPPER - For non-async contexts
 # ══════════════════════════════════════════════════════════════════
 
+# One event loop, running forever in a daemon thread, for sync callers.
+# Async HTTP pools are bound to the loop they were first used on, so this
+# loop gets its own (see get_http_client); a fresh loop per call would
+# need a new pool, and new TLS connections, every time.
+_SYNC_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_SYNC_LOOP_LOCK = threading.Lock()
+
+
+def _get_sync_loop() -> asyncio.AbstractEventLoop:
+    global _SYNC_LOOP
+    if _SYNC_LOOP is None:
+        # Several threads may call plan_columns_sync() at once; start one loop
+        with _SYNC_LOOP_LOCK:
+            if _SYNC_LOOP is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=loop.run_forever,
+                    name="column-planner-sync",
+                    daemon=True
+                ).start()
+                _SYNC_LOOP = loop
+    return _SYNC_LOOP
+
+
 def plan_columns_sync(
     table_name: str,
     table_schema: Dict[str, Any],
@@ -238,7 +1223,8 @@ def plan_columns_sync(
     """
     Synchronous wrapper for plan_columns().
     
-    Use this if you're not in an async context.
+    Use this if you're not in an async context (never from inside a
+    running event loop: it blocks until the result is ready).
     
     Example:
         >>> result = plan_columns_sync(
@@ -247,17 +1233,51 @@ def plan_columns_sync(
         ...     "Show me average MRR"
         ... )
     """
-    import asyncio
+    # No outer timeout: every LLM attempt already has its own deadline
+    # (LLM_REQUEST_TIMEOUT, retried LLM_TIMEOUT_RETRIES times), and a
+    # shorter cap here would cut those retries off
+    return _run_sync(plan_columns(table_name, table_schema, user_requirement, verbose))
+
+
+def plan_columns_many_sync(
+    items: List[Tuple[str, Dict[str, Any], str]],
+    max_concurrency: int = LLM_MAX_CONCURRENCY
+) -> List[Any]:
+    """
+    Synchronous wrapper for plan_columns_many().
+    
+    For scripts that would otherwise loop over plan_columns_sync(): the
+    calls run concurrently, so N plans take about one round-trip, not N.
+    
+    Returns:
+        Same as plan_columns_many()
+    """
+    # No overall timeout: each LLM attempt is bounded by LLM_REQUEST_TIMEOUT
+    # (see _stream_with_deadline), but a large batch queues behind
+    # max_concurrency
+    return _run_sync(plan_columns_many(items, max_concurrency))
+
+
+def _run_sync(coro):
+    """Run coro on the shared background loop and block for its result."""
+    loop = _get_sync_loop()
     
-    # Run the async function in a new event loop
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
     try:
-        return loop.run_until_complete(
-            plan_columns(table_name, table_schema, user_requirement, verbose)
-        )
-    finally:
-        loop.close()
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("Sync planner wrappers cannot be called from their own event loop")
+    
+    # Run on the shared background loop, reusing the cached LLM client
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    try:
+        return future.result()
+    except BaseException:
+        # e.g. KeyboardInterrupt in the caller: don't leave the run behind
+        future.cancel()
+        raise
 
 
 # ══════════════════════════════════════════════════════════════════
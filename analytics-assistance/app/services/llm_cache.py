@@ -0,0 +1,72 @@
+"""
+LLM Cache - In-process result cache for LLM calls
+
+A small LRU cache with optional per-entry TTL. Used by column_planner to
+skip the LLM round-trip (and its token cost) when the same requirement is
+asked again against the same table and model.
+
+Thread-safe: plan_columns() runs on the app's event loop and, for sync
+callers, on column_planner's background loop thread.
+
+Example:
+    cache = LLMCache(maxsize=1024, ttl=3600)
+    hit = cache.get(key)
+    if hit is None:
+        hit = await call_llm()
+        cache.set(key, hit)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+
+class LLMCache:
+    """
+    LRU cache with optional time-to-live.
+
+    Args:
+        maxsize: Max entries kept; least recently used are evicted first
+        ttl: Default seconds an entry stays valid (None/0 = no expiry)
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl or None
+        # key -> (expires_at or None, value)
+        self._entries: "OrderedDict[Hashable, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value (ttl overrides the cache default for this entry)."""
+        ttl = ttl or self.ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -12,13 +12,17 @@ Prompt Engineering Principles Used:
 5. Step-by-step reasoning - Help LLM think through the problem
 
 How this works with LangChain:
-- ChatPromptTemplate creates a reusable template
-- Placeholders like {table_name} get filled at runtime
-- Template is passed to LLM chain
+- Templates are plain str.format() strings ({{ }} are literal braces)
+- build_planner_messages() fills placeholders like {table_name} and
+  returns ready-made chat messages (static parts rendered once)
+- The messages are passed to the LLM chain in column_planner
 - LLM receives formatted prompt and responds
 """
 
-from langchain_core.prompts import ChatPromptTemplate
+import os
+from functools import lru_cache
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 from typing import List, Dict
 
 
@@ -26,7 +30,9 @@ from typing import List, Dict
 # SYSTEM PROMPT - Defines the LLM's role and behavior
 # ══════════════════════════════════════════════════════════════════
 
-SYSTEM_PROMPT = """You are an expert database analyst specializing in business intelligence and SQL query generation.
+# Original long-form prompt. Kept for weaker models that need the extra
+# guidance; select it with OPENAI_VERBOSE_SYSTEM_PROMPT=1.
+SYSTEM_PROMPT_VERBOSE = """You are an expert database analyst specializing in business intelligence and SQL query generation.
 
 Your role is to analyze user requirements and determine:
 1. What columns are REQUIRED (absolutely necessary)
@@ -62,12 +68,41 @@ Output Format:
 - Be concise but informative in explanations
 """
 
+# Terse rewrite (~175 tokens vs ~430): sent on every call that misses the
+# provider prompt cache, and the user prompt already carries the JSON
+# format and filter examples
+SYSTEM_PROMPT_TERSE = """You are a database analyst. For an analytics requirement on one table, decide:
+- required_columns: columns the analysis cannot be done without
+- optional_columns: columns that add useful context or breakdowns
+- sql_filters: WHERE conditions stated in the requirement
+- assumptions: how you resolved anything ambiguous
+
+Rules:
+- Use only column names from the schema, spelled exactly as given.
+- Filters: {{column: value}} for equality, {{column: {{operator: value}}}} for >, <, >=, <=, !=.
+- "above"/"more than" → '>'; flags ("active customers") → 1 or 0; date ranges ("last 2 years") → filter a date column.
+- Currency: $100k → 100000, $5M → 5000000.
+- Reply with valid JSON only; keep explanations short.
+"""
+
+SYSTEM_PROMPT = (
+    SYSTEM_PROMPT_VERBOSE
+    if os.getenv("OPENAI_VERBOSE_SYSTEM_PROMPT") == "1"
+    else SYSTEM_PROMPT_TERSE
+)
+
 
 # ══════════════════════════════════════════════════════════════════
-# USER PROMPT TEMPLATE - The actual analysis request
+# USER PROMPT TEMPLATES - The actual analysis request
 # ══════════════════════════════════════════════════════════════════
 
-USER_PROMPT_TEMPLATE = """Analyze the following analytics requirement and determine what database columns are needed.
+# Split into a static prefix (table, task, rules) and a dynamic suffix
+# (the requirement), sent as two messages. Everything before the
+# requirement is byte-identical for every request on the same table, so
+# the provider's prompt cache can reuse it (cheaper input tokens, faster
+# first token). Keep anything request-specific out of the prefix.
+
+USER_PROMPT_PREFIX_TEMPLATE = """You will be given an analytics requirement for the table below. Determine what database columns are needed.
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 TABLE INFORMATION
@@ -78,12 +113,6 @@ Table Name: {table_name}
 Available Columns:
 {columns_formatted}
 
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-USER'S ANALYTICS REQUIREMENT
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-"{user_requirement}"
-
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 YOUR TASK
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -94,7 +123,7 @@ Step 3: Identify which columns would enhance the analysis (optional)
 Step 4: Extract SQL filter conditions from the user's query
 Step 5: Note any assumptions you made in your interpretation
 
-Return your analysis in this exact JSON format:
+Return ONLY a JSON object in this exact format, no prose:
 {{
   "technical_summary": "A clear technical interpretation of what analysis is needed",
   "required_columns": ["list", "of", "required", "column", "names"],
@@ -121,34 +150,146 @@ Remember:
 - Clearly explain your assumptions
 """
 
+USER_PROMPT_SUFFIX_TEMPLATE = """━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+USER'S ANALYTICS REQUIREMENT
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+"{user_requirement}"
+"""
+
 
 # ══════════════════════════════════════════════════════════════════
-# LANGCHAIN CHAT PROMPT TEMPLATE
+# BATCH USER PROMPT TEMPLATES - Several requirements, one LLM call
 # ══════════════════════════════════════════════════════════════════
 
-COLUMN_PLANNER_PROMPT = ChatPromptTemplate.from_messages([
-    ("system", SYSTEM_PROMPT),
-    ("user", USER_PROMPT_TEMPLATE)
-])
+# Same table block and rules as the single prompt, but the (large) system
+# prompt and column list are sent once for the whole batch. Same
+# prefix/suffix split for provider-side prompt caching.
+BATCH_USER_PROMPT_PREFIX_TEMPLATE = """You will be given numbered analytics requirements for the table below. Determine what database columns each one needs.
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+TABLE INFORMATION
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+Table Name: {table_name}
+
+Available Columns:
+{columns_formatted}
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+YOUR TASK
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+For EACH requirement, independently:
+Step 1: Understand what the user wants to accomplish
+Step 2: Identify which columns are absolutely required
+Step 3: Identify which columns would enhance the analysis (optional)
+Step 4: Extract SQL filter conditions from that requirement
+Step 5: Note any assumptions you made in your interpretation
+
+Return ONLY a JSON object, no prose, with one analysis per requirement in the same order ([Q1] first):
+{{
+  "results": [
+    {{
+      "technical_summary": "A clear technical interpretation of what analysis is needed",
+      "required_columns": ["list", "of", "required", "column", "names"],
+      "optional_columns": ["list", "of", "optional", "column", "names"],
+      "sql_filters": {{"column_name": "value"}} or {{"column_name": {{"operator": value}}}},
+      "assumptions": "Any assumptions you made about the requirement"
+    }}
+  ]
+}}
+
+Filter Examples:
+- "ARR above $100k" → {{"arr": {{">": 100000}}}}
+- "in Healthcare industry" → {{"industry": "Healthcare"}}
+- "Enterprise segment" → {{"segment": "Enterprise"}}
+- "active customers" → {{"is_customer": 1}} or {{"is_active": 1}}
+- "more than 2 years" → use created_at or similar date column with appropriate calculation
+- Multiple conditions → {{"industry": "Healthcare", "arr": {{">": 100000}}}}
+
+Remember:
+- Return exactly one result per requirement, in order
+- Only use columns from the "Available Columns" list above
+- Use exact column names as shown
+- Be specific in your technical summary
+- Extract ALL filter conditions mentioned in each requirement
+- Convert currency values ($100k → 100000, $5M → 5000000)
+- If no filters are mentioned, set sql_filters to null
+- Clearly explain your assumptions
+"""
+
+BATCH_USER_PROMPT_SUFFIX_TEMPLATE = """━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+USER'S ANALYTICS REQUIREMENTS
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
+{requirements_formatted}
 """
-This ChatPromptTemplate object will be used like this:
 
-    prompt = COLUMN_PLANNER_PROMPT.invoke({
-        "table_name": "crm_customers",
-        "columns_formatted": "- customer_id (VARCHAR)\n- mrr (DECIMAL)\n...",
-        "user_requirement": "Show me average MRR by industry"
-    })
+
+# ══════════════════════════════════════════════════════════════════
+# PRE-RENDERED MESSAGES - Hot path used by column_planner
+# ══════════════════════════════════════════════════════════════════
+
+# Message order is [system, table prefix, requirement suffix]. The static
+# parts are rendered once instead of re-templating the whole prompt on every
+# call: the system message at import, the table prefix once per
+# (table_name, columns_formatted). Per request only the short suffix with
+# the requirement is formatted.
+
+SYSTEM_MESSAGE = SystemMessage(content=SYSTEM_PROMPT.format())
+
+
+@lru_cache(maxsize=256)
+def _render_prefix(template: str, table_name: str, columns_formatted: str) -> HumanMessage:
+    return HumanMessage(
+        content=template.format(table_name=table_name, columns_formatted=columns_formatted)
+    )
+
+
+def build_planner_messages(inputs: Dict[str, str]) -> List[BaseMessage]:
+    """
+    Messages for one requirement.
     
-    # prompt is now ready to send to LLM!
-"""
+    Inputs: table_name, columns_formatted, user_requirement, and optionally
+    columns_pruned=True when columns_formatted is a per-requirement subset
+    (rendered without the prefix cache, so one-off lists don't evict the
+    full-table prefixes).
+    """
+    render = _render_prefix.__wrapped__ if inputs.get("columns_pruned") else _render_prefix
+    return [
+        SYSTEM_MESSAGE,
+        render(USER_PROMPT_PREFIX_TEMPLATE, inputs["table_name"], inputs["columns_formatted"]),
+        HumanMessage(content=USER_PROMPT_SUFFIX_TEMPLATE.format(
+            user_requirement=inputs["user_requirement"]
+        ))
+    ]
+
+
+def build_planner_batch_messages(inputs: Dict[str, str]) -> List[BaseMessage]:
+    """
+    Messages for several requirements.
+    
+    Inputs: table_name, columns_formatted, requirements_formatted.
+    """
+    return [
+        SYSTEM_MESSAGE,
+        _render_prefix(BATCH_USER_PROMPT_PREFIX_TEMPLATE, inputs["table_name"], inputs["columns_formatted"]),
+        HumanMessage(content=BATCH_USER_PROMPT_SUFFIX_TEMPLATE.format(
+            requirements_formatted=inputs["requirements_formatted"]
+        ))
+    ]
 
 
 # ══════════════════════════════════════════════════════════════════
 # HELPER FUNCTION - Format columns nicely for the prompt
 # ══════════════════════════════════════════════════════════════════
 
-def format_columns_for_prompt(columns: List[Dict]) -> str:
+# Tag suffix per (primary_key | not_nullable << 1)
+_COLUMN_TAGS = ("", ", PRIMARY KEY", ", NOT NULL", ", PRIMARY KEY, NOT NULL")
+
+
+def format_columns_for_prompt(columns: List[Dict], compact: bool = False) -> str:
     """
     Convert column list from schema registry into human-readable format.
     
@@ -164,8 +305,15 @@ def format_columns_for_prompt(columns: List[Dict]) -> str:
     - mrr (DECIMAL(10,2), NOT NULL)
     - industry (VARCHAR)
     
+    Compact format (compact=True, roughly half the tokens per column):
+    customer_id:VARCHAR pk
+    mrr:DECIMAL(10,2)
+    industry:VARCHAR
+    
     Args:
         columns: List of column dictionaries from schema registry
+        compact: Emit terse "name:type" lines (primary keys marked "pk",
+                 nullability dropped) to cut prompt input tokens
         
     Returns:
         Formatted string with one column per line
@@ -174,30 +322,35 @@ def format_columns_for_prompt(columns: List[Dict]) -> str:
         >>> cols = [{"name": "id", "type": "INT", "nullable": False, "primary_key": True}]
         >>> format_columns_for_prompt(cols)
         '- id (INT, PRIMARY KEY, NOT NULL)'
+        >>> format_columns_for_prompt(cols, compact=True)
+        'id:INT pk'
     """
-    formatted_lines = []
+    if compact:
+        return "\n".join(
+            f"{col['name']}:{col['type']} pk" if col.get('primary_key')
+            else f"{col['name']}:{col['type']}"
+            for col in columns
+        )
     
-    for col in columns:
-        # Start with basic format: "- name (type"
-        line = f"- {col['name']} ({col['type']}"
-        
-        # Add tags for special properties
-        tags = []
-        
-        if col.get('primary_key'):
-            tags.append("PRIMARY KEY")
-        
-        if not col.get('nullable', True):
-            tags.append("NOT NULL")
-        
-        # Add tags if any exist
-        if tags:
-            line += ", " + ", ".join(tags)
-        
-        line += ")"
-        formatted_lines.append(line)
+    # "- name (type" + tags + ")", one join instead of per-line concatenation
+    return "\n".join(
+        f"- {col['name']} ({col['type']}"
+        f"{_COLUMN_TAGS[bool(col.get('primary_key')) | ((not col.get('nullable', True)) << 1)]})"
+        for col in columns
+    )
+
+
+def format_requirements_for_prompt(requirements: List[str]) -> str:
+    """
+    Number requirements for the batch prompt.
     
-    return "\n".join(formatted_lines)
+    Example:
+        >>> format_requirements_for_prompt(["Average MRR by industry", "Churn by month"])
+        '[Q1] "Average MRR by industry"\n[Q2] "Churn by month"'
+    """
+    return "\n".join(
+        f'[Q{i}] "{requirement}"' for i, requirement in enumerate(requirements, start=1)
+    )
 
 
 # ══════════════════════════════════════════════════════════════════
@@ -207,7 +360,7 @@ def format_columns_for_prompt(columns: List[Dict]) -> str:
 """
 How to use this in your code:
 
-    from app.services.prompts import COLUMN_PLANNER_PROMPT, format_columns_for_prompt
+    from app.services.prompts import build_planner_messages, format_columns_for_prompt
     from app.schemas.schema_registry import get_table_schema
     
     # 1. Get table schema
@@ -216,14 +369,14 @@ How to use this in your code:
     # 2. Format columns for prompt
     columns_text = format_columns_for_prompt(schema["columns"])
     
-    # 3. Create the prompt
-    prompt = COLUMN_PLANNER_PROMPT.invoke({
+    # 3. Create the prompt messages
+    messages = build_planner_messages({
         "table_name": "crm_customers",
         "columns_formatted": columns_text,
         "user_requirement": "Show me average MRR by industry"
     })
     
     # 4. Send to LLM (next step - column_planner.py)
-    # result = llm.invoke(prompt)
+    # result = llm.invoke(messages)
 """
 
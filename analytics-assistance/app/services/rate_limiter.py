@@ -0,0 +1,55 @@
+"""
+Rate Limiter - Client-side token bucket for LLM requests
+
+The API enforces requests-per-minute limits server-side: going over costs a
+full round-trip that ends in a 429 and a retry. Waiting locally instead
+keeps bursts (batch fan-outs, prefetch) under the limit without those
+wasted requests.
+
+Thread-safe and loop-agnostic: plan_columns() runs on the app's event loop
+and on column_planner's background loop thread, and both draw from the same
+bucket. Waiting happens outside the lock with asyncio.sleep().
+
+Example:
+    bucket = TokenBucket(rate_per_minute=500)
+    await bucket.acquire()
+    response = await call_llm()
+"""
+
+import asyncio
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Token bucket allowing rate_per_minute requests, in bursts up to capacity.
+
+    Args:
+        rate_per_minute: Sustained requests per minute
+        capacity: Max burst size (default: one minute's worth)
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take one token and return the seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Going negative queues the caller behind earlier reservations
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent."""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
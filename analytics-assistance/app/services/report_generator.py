@@ -9,37 +9,147 @@ It builds safe, parameterized SQL queries based on user requirements.
 
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncEngine
-from typing import List, Dict, Any, Optional
+from sqlalchemy.sql.elements import TextClause
+from typing import AsyncIterator, Iterator, List, Dict, Any, Optional, Tuple, Union
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+import asyncio
 import logging
+import os
+import re
 from app.schemas.schema_registry import get_table_schema
+from app.services.llm_cache import LLMCache
 
 logger = logging.getLogger(__name__)
 
+# Rows fetched per round-trip from the server-side cursor. Rows are read in
+# partitions of this size instead of one fetchall() of the whole result.
+STREAM_BATCH_SIZE = 200
+
+# Dashboards re-issue the same (table, columns, filters, limit) queries;
+# results are reused for REPORT_CACHE_TTL seconds (0 disables the cache)
+REPORT_CACHE_SIZE = int(os.getenv("REPORT_CACHE_SIZE", "1024"))
+REPORT_CACHE_TTL = float(os.getenv("REPORT_CACHE_TTL", "300"))
+
+_REPORT_CACHE = LLMCache(maxsize=REPORT_CACHE_SIZE, ttl=REPORT_CACHE_TTL)
+
+# Queries currently running, so concurrent identical requests share one
+# database round-trip instead of all missing the cache at once
+_REPORT_INFLIGHT: Dict[Tuple[Optional[str], str, str], "asyncio.Task"] = {}
+
+# "hits"/"misses" of the report cache, for observability
+REPORT_CACHE_STATS: Counter = Counter()
+
+# ":name" bind parameters in a built query
+_PARAM_RE = re.compile(r":(\w+)")
+
+# "records": one dict per row. "columns": {column: [values...]}, built from
+# row tuples without a dict per row; much cheaper for wide/large results
+# and what dataframe/chart consumers want anyway.
+REPORT_OUTPUT_FORMATS = ("records", "columns")
+
+# Reports run at once by a single generate_reports() call. Keep it at or
+# below the engine's pool size so one dashboard can't drain the pool.
+REPORT_MAX_CONCURRENCY = int(os.getenv("REPORT_MAX_CONCURRENCY", "10"))
+
+# Filter operator → (bind parameter suffix, SQL operator)
+_OP_MAP = {
+    '>': ('gt', '>'),
+    '<': ('lt', '<'),
+    '>=': ('gte', '>='),
+    '<=': ('lte', '<='),
+    '=': ('eq', '='),
+    '!=': ('neq', '!='),
+}
+
+
+# ══════════════════════════════════════════════════════════════════
+# DATA MODEL - Report request and result
+# ══════════════════════════════════════════════════════════════════
+
+@dataclass(slots=True, frozen=True)
+class ReportSpec:
+    """One report for generate_reports(); same meaning as generate_report()'s arguments."""
+    table_name: str
+    columns: List[str]
+    filters: Optional[Dict[str, Any]] = None
+    limit: int = 100
+    cache_scope: Optional[str] = None
+    output_format: str = "records"
+
+
+@dataclass(slots=True, frozen=True)
+class ReportResult:
+    """
+    Rows returned by generate_report().
+    
+    orjson serializes dataclasses natively, so routes can return this as-is
+    without building an intermediate dict.
+    
+    Attributes:
+        table_name: Table that was queried
+        columns: Selected columns, in order
+        row_count: Number of rows in data
+        data: One dict per row, or {column: values} for output_format
+              "columns" (shared with the report cache, don't mutate)
+        query_executed: The SQL with values inlined (for debugging); None
+                        unless requested or DEBUG logging is on
+    """
+    table_name: str
+    columns: List[str]
+    row_count: int
+    data: Union[List[Dict[str, Any]], Dict[str, List[Any]]]
+    query_executed: Optional[str] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary (rows are not copied)"""
+        return {
+            "table_name": self.table_name,
+            "columns": self.columns,
+            "row_count": self.row_count,
+            "data": self.data,
+            "query_executed": self.query_executed,
+        }
+
 
 async def generate_report(
     engine: AsyncEngine,
     table_name: str,
     columns: List[str],
     filters: Optional[Dict[str, Any]] = None,
-    limit: int = 100
-) -> Dict[str, Any]:
+    limit: int = 100,
+    cache_scope: Optional[str] = None,
+    include_executed_query: bool = False,
+    output_format: str = "records"
+) -> ReportResult:
     """
     Execute a real SQL query and return actual database results.
     
+    Identical queries within REPORT_CACHE_TTL seconds are served from an
+    in-process cache; the returned rows are shared, don't mutate them.
+    
     Args:
         engine: SQLAlchemy async engine
         table_name: Name of the table to query
         columns: List of columns to select
         filters: Optional filters (e.g., {'segment': 'Enterprise', 'mrr': {'>': 500}})
         limit: Maximum number of rows to return (capped at 1000)
+        cache_scope: Optional cache partition (e.g. a user or role id) for
+                     callers whose results must not be shared
+        include_executed_query: Fill query_executed (also filled when this
+                     module logs at DEBUG); skipped otherwise, it's only
+                     for debugging
+        output_format: "records" (list of row dicts) or "columns"
+                     ({column: [values]}, cheaper for large results)
     
     Returns:
-        Dictionary with:
+        ReportResult with:
         - table_name: str
         - columns: List[str]
         - row_count: int
-        - data: List[Dict[str, Any]]
-        - query_executed: str (for debugging)
+        - data: List[Dict[str, Any]] (or Dict[str, List[Any]] for "columns")
+        - query_executed: Optional[str] (for debugging)
     
     Example:
         result = await generate_report(
@@ -51,6 +161,106 @@ async def generate_report(
         )
     """
     
+    # ═══════════════════════════════════════════════════════════
+    # STEP 1: Build parameterized SQL query (limit capped at 1000)
+    # ═══════════════════════════════════════════════════════════
+    
+    if output_format not in REPORT_OUTPUT_FORMATS:
+        raise ValueError(
+            f"Unsupported output_format {output_format!r}. "
+            f"Supported: {', '.join(REPORT_OUTPUT_FORMATS)}"
+        )
+    
+    stmt, params = _build_query(table_name, columns, filters, limit)
+    
+    # ═══════════════════════════════════════════════════════════
+    # STEP 2: Execute query and fetch results
+    # ═══════════════════════════════════════════════════════════
+    
+    data, row_count = await _fetch_cached(
+        engine, stmt, params, cache_scope, columns, output_format
+    )
+    
+    # ═══════════════════════════════════════════════════════════
+    # STEP 3: Return results
+    # ═══════════════════════════════════════════════════════════
+    
+    query_executed = None
+    if include_executed_query or logger.isEnabledFor(logging.DEBUG):
+        query_executed = _render_query(stmt.text, params)
+    
+    return ReportResult(
+        table_name=table_name,
+        columns=columns,
+        row_count=row_count,
+        data=data,
+        query_executed=query_executed
+    )
+
+
+async def generate_reports(
+    engine: AsyncEngine,
+    specs: List[ReportSpec],
+    max_concurrency: int = REPORT_MAX_CONCURRENCY
+) -> List[ReportResult]:
+    """
+    Run several independent reports concurrently (e.g. one dashboard).
+    
+    At most max_concurrency queries hold a pooled connection at a time;
+    total time is about that of the slowest batch instead of the sum.
+    
+    Returns:
+        One ReportResult per spec, in order
+    
+    Raises:
+        ExceptionGroup: If any report fails (the others are cancelled)
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def _run_one(spec: ReportSpec) -> ReportResult:
+        async with semaphore:
+            return await generate_report(
+                engine,
+                spec.table_name,
+                spec.columns,
+                filters=spec.filters,
+                limit=spec.limit,
+                cache_scope=spec.cache_scope,
+                output_format=spec.output_format
+            )
+    
+    async with asyncio.TaskGroup() as tg:
+        tasks = [tg.create_task(_run_one(spec)) for spec in specs]
+    
+    return [task.result() for task in tasks]
+
+
+async def generate_report_stream(
+    engine: AsyncEngine,
+    table_name: str,
+    columns: List[str],
+    filters: Optional[Dict[str, Any]] = None,
+    limit: int = 100
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Same query as generate_report(), yielded as it is read.
+    
+    Yields lists of up to STREAM_BATCH_SIZE row dicts, so a caller (e.g. a
+    StreamingResponse) can send rows on without buffering the whole result.
+    """
+    stmt, params = _build_query(table_name, columns, filters, limit)
+    async for partition in _stream_rows(engine, stmt, params):
+        yield partition
+
+
+def _build_query(
+    table_name: str,
+    columns: List[str],
+    filters: Optional[Dict[str, Any]],
+    limit: int
+) -> Tuple[TextClause, Dict[str, Any]]:
+    """Build the parameterized SELECT for generate_report(); returns (stmt, params)."""
+    
     # ═══════════════════════════════════════════════════════════
     # STEP 1: Validate and cap limit
     # ═══════════════════════════════════════════════════════════
@@ -60,13 +270,24 @@ async def generate_report(
         logger.warning(f"Limit capped at 1000 rows (requested: {limit})")
     
     # ═══════════════════════════════════════════════════════════
-    # STEP 2: Get schema information and build full table name
+    # STEP 2: Validate identifiers and build full table name
     # ═══════════════════════════════════════════════════════════
     
     table_info = get_table_schema(table_name)
     
+    # Identifiers are interpolated into the SQL, so only names known to the
+    # schema registry get through (values are always bound parameters)
+    if table_info is None:
+        raise ValueError(f"Unknown table: {table_name}")
+    
+    allowed_columns = table_info['column_name_set']
+    unknown = [col for col in columns if col not in allowed_columns]
+    unknown += [col for col in (filters or ()) if col not in allowed_columns]
+    if unknown:
+        raise ValueError(f"Unknown columns for {table_name}: {', '.join(unknown)}")
+    
     # Build full table name with schema prefix (for PostgreSQL)
-    if table_info and table_info.get('schema'):
+    if table_info.get('schema'):
         full_table_name = f"{table_info['schema']}.{table_name}"
     else:
         full_table_name = table_name
@@ -77,76 +298,160 @@ async def generate_report(
     # STEP 3: Build SQL query
     # ═══════════════════════════════════════════════════════════
     
-    # Build SELECT clause
-    columns_str = ", ".join(columns)
-    
-    # Build WHERE clause
-    where_clause = ""
-    params = {}
-    
-    if filters:
-        conditions = []
-        for col, value in filters.items():
-            if isinstance(value, dict):
-                # Handle operators like {'mrr': {'>': 500}}
-                for operator, filter_value in value.items():
-                    param_name = f"{col}_{operator.replace('>', 'gt').replace('<', 'lt').replace('=', 'eq')}"
-                    if operator == '>':
-                        conditions.append(f"{col} > :{param_name}")
-                    elif operator == '<':
-                        conditions.append(f"{col} < :{param_name}")
-                    elif operator == '>=':
-                        conditions.append(f"{col} >= :{param_name}")
-                    elif operator == '<=':
-                        conditions.append(f"{col} <= :{param_name}")
-                    elif operator == '=':
-                        conditions.append(f"{col} = :{param_name}")
-                    elif operator == '!=':
-                        conditions.append(f"{col} != :{param_name}")
-                    params[param_name] = filter_value
-            else:
-                # Simple equality: {'segment': 'Enterprise'}
-                param_name = f"{col}_eq"
-                conditions.append(f"{col} = :{param_name}")
-                params[param_name] = value
-        
-        if conditions:
-            where_clause = " WHERE " + " AND ".join(conditions)
+    # Build WHERE conditions (values go to params, never into the SQL)
+    terms = list(_filter_terms(filters)) if filters else []
+    conditions, names, values = zip(*terms) if terms else ((), (), ())
+    params = dict(zip(names, values))
     
-    # Build final query with schema prefix
-    sql_query = f"SELECT {columns_str} FROM {full_table_name}{where_clause} LIMIT :limit"
+    # Build final query with schema prefix (one TextClause per query shape)
+    stmt = _build_stmt(full_table_name, tuple(columns), conditions)
     params['limit'] = limit
     
-    logger.info(f"Executing query: {sql_query}")
+    logger.info(f"Executing query: {stmt.text}")
     logger.info(f"With params: {params}")
     
-    # ═══════════════════════════════════════════════════════════
-    # STEP 3: Execute query and fetch results
-    # ═══════════════════════════════════════════════════════════
+    return stmt, params
+
+
+def _filter_terms(filters: Dict[str, Any]) -> Iterator[Tuple[str, str, Any]]:
+    """
+    Yield (condition, param_name, value) for every filter term.
     
-    async with engine.begin() as conn:
-        result = await conn.execute(text(sql_query), params)
-        rows = result.fetchall()
-        
-        # Convert rows to list of dictionaries
-        data = []
-        for row in rows:
-            # row._mapping gives us a dict-like object
-            data.append(dict(row._mapping))
+    {'segment': 'Enterprise'} is an equality; {'mrr': {'>': 500, '<': 900}}
+    gives one term per operator.
+    """
+    for col, value in filters.items():
+        items = value.items() if isinstance(value, dict) else (('=', value),)
+        for operator, filter_value in items:
+            try:
+                suffix, sql_op = _OP_MAP[operator]
+            except KeyError:
+                raise ValueError(
+                    f"Unsupported filter operator {operator!r} for column {col!r}. "
+                    f"Supported: {', '.join(_OP_MAP)}"
+                ) from None
+            param_name = f"{col}_{suffix}"
+            yield f"{col} {sql_op} :{param_name}", param_name, filter_value
+
+
+@lru_cache(maxsize=512)
+def _build_stmt(
+    full_table_name: str,
+    columns: Tuple[str, ...],
+    conditions: Tuple[str, ...]
+) -> TextClause:
+    """
+    SELECT statement for one query shape (table, columns, filter conditions).
     
-    # ═══════════════════════════════════════════════════════════
-    # STEP 4: Return results
-    # ═══════════════════════════════════════════════════════════
+    Only the bound values differ between calls with the same shape, so the
+    same TextClause is reused and SQLAlchemy's compiled cache (keyed on the
+    statement) and asyncpg's prepared statements keep hitting.
+    """
+    where_clause = " WHERE " + " AND ".join(conditions) if conditions else ""
+    return text(f"SELECT {', '.join(columns)} FROM {full_table_name}{where_clause} LIMIT :limit")
+
+
+def _render_query(sql_query: str, params: Dict[str, Any]) -> str:
+    """
+    The query with its bound values inlined, for display/debugging only.
+    
+    One regex pass over the SQL; never executed.
+    """
+    def _literal(match: re.Match) -> str:
+        name = match.group(1)
+        if name not in params:
+            return match.group(0)
+        value = params[name]
+        if value is None:
+            return "NULL"
+        if isinstance(value, str):
+            return "'" + value.replace("'", "''") + "'"
+        return str(value)
+    
+    return _PARAM_RE.sub(_literal, sql_query)
+
+
+async def _fetch_cached(
+    engine: AsyncEngine,
+    stmt: TextClause,
+    params: Dict[str, Any],
+    cache_scope: Optional[str],
+    columns: List[str],
+    output_format: str
+) -> Tuple[Any, int]:
+    """(data, row_count) for the query, from the report cache when possible."""
+    if not REPORT_CACHE_TTL:
+        return await _fetch_all(engine, stmt, params, columns, output_format)
+    
+    # repr(): filter values come from request JSON and may be unhashable
+    cache_key = (cache_scope, output_format, stmt.text, repr(sorted(params.items())))
+    entry = _REPORT_CACHE.get(cache_key)
+    if entry is not None:
+        REPORT_CACHE_STATS["hits"] += 1
+        return entry
+    REPORT_CACHE_STATS["misses"] += 1
+    
+    task = _REPORT_INFLIGHT.get(cache_key)
+    if task is None:
+        task = asyncio.ensure_future(_fetch_all(engine, stmt, params, columns, output_format))
+        _REPORT_INFLIGHT[cache_key] = task
+        task.add_done_callback(lambda _: _REPORT_INFLIGHT.pop(cache_key, None))
     
-    return {
-        "table_name": table_name,
-        "columns": columns,
-        "row_count": len(data),
-        "data": data,
-        "query_executed": sql_query.replace(":limit", str(limit))
-        .replace(":".join([f":{k}" for k in params.keys()]), 
-                 ", ".join([str(v) for v in params.values()]))
-    }
+    # shield(): one caller disconnecting doesn't cancel the query for the rest
+    entry = await asyncio.shield(task)
+    _REPORT_CACHE.set(cache_key, entry)
+    return entry
+
+
+async def _fetch_all(
+    engine: AsyncEngine,
+    stmt: TextClause,
+    params: Dict[str, Any],
+    columns: List[str],
+    output_format: str
+) -> Tuple[Any, int]:
+    if output_format == "columns":
+        rows = []
+        async for partition in _stream_rows(engine, stmt, params, as_dicts=False):
+            rows.extend(partition)
+        # Transpose once: one list per column, no dict per row
+        values = zip(*rows) if rows else ([] for _ in columns)
+        return {col: list(vals) for col, vals in zip(columns, values)}, len(rows)
+    
+    data = []
+    async for partition in _stream_rows(engine, stmt, params):
+        data.extend(partition)
+    return data, len(data)
+
+
+async def _stream_rows(
+    engine: AsyncEngine,
+    stmt: TextClause,
+    params: Dict[str, Any],
+    as_dicts: bool = True
+) -> AsyncIterator[List[Any]]:
+    """
+    Run the query on a server-side cursor, yielding rows per partition.
+    
+    Rows are dicts, or plain tuples (in SELECT order) with as_dicts=False.
+    """
+    # Read-only: connect() instead of begin(), nothing to commit
+    async with engine.connect() as conn:
+        result = await conn.stream(
+            stmt,
+            params,
+            execution_options={"yield_per": STREAM_BATCH_SIZE}
+        )
+        if not as_dicts:
+            async for partition in result.tuples().partitions(STREAM_BATCH_SIZE):
+                yield partition
+            return
+        
+        # mappings() yields RowMapping objects directly (no per-row
+        # ._mapping lookup); map(dict) copies them into plain dicts, which
+        # orjson serializes natively and which are safe to cache
+        async for partition in result.mappings().partitions(STREAM_BATCH_SIZE):
+            yield list(map(dict, partition))
 
 
 # ══════════════════════════════════════════════════════════════════
@@ -164,7 +469,7 @@ result = await generate_report(
     limit=10
 )
 
-# Returns:
+# Returns (ReportResult, shown serialized):
 {
     "table_name": "crm_customers",
     "columns": ["customer_id", "first_name", "last_name"],
@@ -188,7 +493,7 @@ result = await generate_report(
     limit=50
 )
 
-# Returns:
+# Returns (ReportResult, shown serialized):
 {
     "table_name": "crm_customers",
     "columns": ["customer_id", "segment", "mrr"],
@@ -0,0 +1,171 @@
+"""
+Semantic Cache - Reuse LLM plans for paraphrased requirements
+
+The exact plan cache only hits when a requirement is asked again with the
+same words. Users paraphrase ("avg MRR by industry" vs "mean monthly
+recurring revenue grouped by industry"), so this cache compares requirement
+embeddings instead and returns a stored plan when the cosine similarity is
+above a threshold.
+
+Entries are scoped (model, table, column set, ...), so a near-duplicate
+question against a different table or schema never matches.
+
+Opt-in (SEMANTIC_CACHE=1): each lookup costs one embeddings API call,
+which is much cheaper and faster than a planner call but not free.
+
+Flow:
+    requirement → embedding → best cosine match in scope → plan (or miss)
+
+Each scope keeps its embeddings as rows of one float32 matrix, so a lookup
+is a single matrix-vector product instead of a Python loop per entry.
+"""
+
+import logging
+import os
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+from langchain_openai import OpenAIEmbeddings
+
+from app.services.llm_cache import LLMCache
+
+
+logger = logging.getLogger(__name__)
+
+
+# ══════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ══════════════════════════════════════════════════════════════════
+
+# Small, cheap embedding model (~$0.02 per 1M tokens)
+EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+
+# Minimum cosine similarity for a paraphrase to count as the same question
+DEFAULT_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+
+# Entries kept per scope (oldest dropped first); bounds lookup cost
+DEFAULT_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "500"))
+
+# (model, text) -> normalized embedding. The same requirement is looked up
+# again against other tables, and again once its exact-cache entry expires;
+# each hit saves an embeddings API round-trip.
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+_EMBEDDING_CACHE = LLMCache(maxsize=EMBEDDING_CACHE_SIZE)
+
+
+@lru_cache(maxsize=1)
+def get_embeddings() -> OpenAIEmbeddings:
+    """Build the embeddings client once per process."""
+    return OpenAIEmbeddings(model=EMBEDDING_MODEL)
+
+
+def _normalize(vector: List[float]) -> np.ndarray:
+    # Unit length, so cosine similarity is a plain dot product
+    array = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(array)) or 1.0
+    return array / norm
+
+
+async def _embed(text: str) -> np.ndarray:
+    """Normalized embedding of text, from _EMBEDDING_CACHE when possible."""
+    key = (EMBEDDING_MODEL, text)
+    vector = _EMBEDDING_CACHE.get(key)
+    if vector is None:
+        vector = _normalize(await get_embeddings().aembed_query(text))
+        # Shared between callers; add() copies it into the scope matrix
+        vector.flags.writeable = False
+        _EMBEDDING_CACHE.set(key, vector)
+    return vector
+
+
+class _Scope:
+    """
+    Ring buffer of (embedding, value) pairs for one scope.
+    
+    Rows of `vectors` past `size` are unused; once full, `next` wraps and
+    the oldest entry is overwritten.
+    """
+    
+    __slots__ = ("vectors", "values", "size", "next")
+    
+    def __init__(self, max_entries: int, dim: int):
+        self.vectors = np.zeros((max_entries, dim), dtype=np.float32)
+        self.values: List[Any] = [None] * max_entries
+        self.size = 0
+        self.next = 0
+
+
+# ══════════════════════════════════════════════════════════════════
+# CACHE
+# ══════════════════════════════════════════════════════════════════
+
+class SemanticCache:
+    """
+    Embedding-similarity cache, scoped by an arbitrary hashable key.
+
+    Args:
+        threshold: Minimum cosine similarity for a hit (0-1)
+        max_entries: Entries kept per scope
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_THRESHOLD,
+        max_entries: int = DEFAULT_MAX_ENTRIES
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._scopes: Dict[Hashable, _Scope] = {}
+        self._lock = threading.Lock()
+
+    async def lookup(
+        self,
+        scope: Hashable,
+        text: str
+    ) -> Tuple[Optional[Any], Optional[np.ndarray]]:
+        """
+        Find a stored value for text (or a paraphrase of it) in scope.
+
+        Returns:
+            (value or None, embedding of text). Pass the embedding to add()
+            on a miss so it isn't computed twice. Both are None if the
+            embedding call fails; the cache is best-effort.
+        """
+        try:
+            vector = await _embed(text)
+        except Exception as e:
+            logger.warning("Semantic cache lookup skipped: %s", e)
+            return None, None
+
+        with self._lock:
+            entries = self._scopes.get(scope)
+            if entries is None or not entries.size or entries.vectors.shape[1] != vector.shape[0]:
+                return None, vector
+
+            # Cosine similarity against every stored embedding at once
+            scores = entries.vectors[:entries.size] @ vector
+            best = int(scores.argmax())
+            if scores[best] < self.threshold:
+                return None, vector
+            return entries.values[best], vector
+
+    def add(self, scope: Hashable, vector: np.ndarray, value: Any) -> None:
+        """Store value under an embedding returned by lookup()."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            entries = self._scopes.get(scope)
+            if entries is None or entries.vectors.shape[1] != vector.shape[0]:
+                # New scope, or the embedding model (and dimension) changed
+                entries = self._scopes[scope] = _Scope(self.max_entries, vector.shape[0])
+            entries.vectors[entries.next] = vector
+            entries.values[entries.next] = value
+            entries.next = (entries.next + 1) % self.max_entries
+            entries.size = min(entries.size + 1, self.max_entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._scopes.clear()
+        _EMBEDDING_CACHE.clear()